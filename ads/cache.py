@@ -0,0 +1,172 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.routers import reads_from_replica
+
+# payloads and generation counters live in the default cache, which has to be
+# shared by every process (see `users.checks`): with a cache of each process an
+# invalidation only reaches the worker that made it and the others keep serving
+# the old payloads for up to `ADS_CACHE_TTL` seconds
+LIST_GENERATION_KEY = "ads:list:generation"
+STATS_KEY = "ads:cache:{kind}:{outcome}"
+STATS_KINDS = ("list", "retrieve")
+
+
+def _generation(key: str) -> int:
+    """
+    Returns the current value of a generation counter.
+
+    A missing counter (never set or evicted) starts from the current time, so it
+    can never fall back to a value that still names old cache entries.
+    """
+
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _incr(key: str, initial: int) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, initial, timeout=None):
+            cache.incr(key)
+
+
+def _detail_generation_key(pk) -> str:
+    return f"ads:detail:{pk}:generation"
+
+
+def _generation_key(pk=None) -> str:
+    return LIST_GENERATION_KEY if pk is None else _detail_generation_key(pk)
+
+
+def _invalidated_key(generation_key: str) -> str:
+    # present for as long as a replica may still serve rows from before the
+    # generation moved
+    return f"{generation_key}:invalidated"
+
+
+def _list_digest(request) -> str:
+    query = sorted(request.query_params.lists())
+    return hashlib.md5(
+        f"{request.get_host()}{request.path}{query}".encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def list_key(request) -> str:
+    """Key of a rendered list page: host, path and query params in stable order."""
+
+    return f"ads:list:{_generation(LIST_GENERATION_KEY)}:{_list_digest(request)}"
+
+
+def detail_key(pk) -> str:
+    return f"ads:detail:{pk}:{_generation(_detail_generation_key(pk))}"
+
+
+def get_payload(kind: str, key: str):
+    """Returns the cached payload or `None`, counting the hit or miss."""
+
+    data = cache.get(key)
+    outcome = "misses" if data is None else "hits"
+    _incr(STATS_KEY.format(kind=kind, outcome=outcome), 1)
+    return data
+
+
+def set_payload(key: str, data, pk=None) -> None:
+    """
+    Caches the list page, or the payload of the ad `pk`, for `ADS_CACHE_TTL`
+    seconds.
+
+    A payload read from a replica shortly after the list or the ad was
+    invalidated may predate the change, so it is not cached and the next miss
+    reads it again.
+    """
+
+    if reads_from_replica() and cache.get(_invalidated_key(_generation_key(pk))):
+        return
+    cache.set(key, data, timeout=settings.ADS_CACHE_TTL)
+
+
+# async variants for `ads.views.AdViewSet` under ASGI
+
+
+async def _ageneration(key: str) -> int:
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+async def _aincr(key: str, initial: int) -> None:
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, initial, timeout=None):
+            await cache.aincr(key)
+
+
+async def alist_key(request) -> str:
+    generation = await _ageneration(LIST_GENERATION_KEY)
+    return f"ads:list:{generation}:{_list_digest(request)}"
+
+
+async def adetail_key(pk) -> str:
+    return f"ads:detail:{pk}:{await _ageneration(_detail_generation_key(pk))}"
+
+
+async def aget_payload(kind: str, key: str):
+    data = await cache.aget(key)
+    outcome = "misses" if data is None else "hits"
+    await _aincr(STATS_KEY.format(kind=kind, outcome=outcome), 1)
+    return data
+
+
+async def aset_payload(key: str, data, pk=None) -> None:
+    if reads_from_replica() and await cache.aget(_invalidated_key(_generation_key(pk))):
+        return
+    await cache.aset(key, data, timeout=settings.ADS_CACHE_TTL)
+
+
+def invalidate(*pks) -> None:
+    """Makes every cached list page and the cached payloads of the ads unreachable."""
+
+    generation_keys = [LIST_GENERATION_KEY, *map(_detail_generation_key, pks)]
+    if settings.DB_REPLICAS:
+        # set before the generations move, so a request that sees a new
+        # generation also sees these; a replica that lagged less than the
+        # maximum at its last lag check may lag behind by the check interval
+        timeout = math.ceil(
+            settings.DB_REPLICA_MAX_LAG + settings.DB_REPLICA_LAG_CHECK_INTERVAL
+        )
+        cache.set_many(
+            {_invalidated_key(key): True for key in generation_keys},
+            timeout=max(timeout, 1),
+        )
+    for key in generation_keys:
+        _incr(key, time.time_ns())
+
+
+def stats() -> dict:
+    """Hit and miss counters per cached action."""
+
+    keys = {
+        (kind, outcome): STATS_KEY.format(kind=kind, outcome=outcome)
+        for kind in STATS_KINDS
+        for outcome in ("hits", "misses")
+    }
+    values = cache.get_many(keys.values())
+    return {
+        kind: {
+            outcome: values.get(keys[kind, outcome], 0)
+            for outcome in ("hits", "misses")
+        }
+        for kind in STATS_KINDS
+    }
@@ -0,0 +1,103 @@
+import csv
+import itertools
+import json
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+# (column, exported name), named like the fields of `AdSerializer`
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("title", "title"),
+    ("price", "price"),
+    ("description", "description"),
+    ("author_id", "author"),
+    ("reviews_count", "reviews_count"),
+    ("last_review_at", "last_review_at"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+)
+EXPORT_FIELDS = tuple(name for _, name in EXPORT_COLUMNS)
+
+
+def _format_datetime(value: datetime) -> str:
+    # same representation as `serializers.DateTimeField`
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value.removesuffix("+00:00") + "Z"
+    return value
+
+
+def _iter_values(queryset, columns: tuple[str, ...]) -> Iterator[tuple]:
+    queryset = queryset.order_by("pk").values_list(*columns)
+    chunk_size = settings.ADS_EXPORT_CHUNK_SIZE
+    if not connections[queryset.db].settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    # the whole result would be fetched at once without a server-side cursor,
+    # so chunks are read by primary key, the first column, in queries of their own
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def export_rows(queryset) -> Iterator[tuple]:
+    """
+    Yields ads as plain tuples in the order of `EXPORT_FIELDS`.
+
+    Rows are fetched with a server-side cursor in chunks of
+    `ADS_EXPORT_CHUNK_SIZE`, or in a query per chunk when server-side cursors
+    are disabled, so memory use does not depend on the table size.
+    """
+
+    rows = _iter_values(queryset, tuple(column for column, _ in EXPORT_COLUMNS))
+    for row in rows:
+        yield tuple(
+            _format_datetime(value) if isinstance(value, datetime) else value
+            for value in row
+        )
+
+
+def iter_ndjson(queryset) -> Iterator[str]:
+    for row in export_rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """File-like object whose `write` returns the line instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(queryset) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+async def aiter_lines(lines: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Async iterator over the lines of an export, for responses served under ASGI.
+
+    Django's ASGI handler reads a sync iterator to the end before sending any of
+    it, so the lines are read in a worker thread `ADS_EXPORT_CHUNK_SIZE` at a
+    time and every chunk is sent before the next one is read.
+    """
+
+    chunk_size = settings.ADS_EXPORT_CHUNK_SIZE
+    read_chunk = sync_to_async(lambda: "".join(itertools.islice(lines, chunk_size)))
+    # lines are never empty, so an empty chunk is the end of the export
+    while chunk := await read_chunk():
+        yield chunk
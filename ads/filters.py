@@ -0,0 +1,107 @@
+import re
+from typing import override
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Upper
+from rest_framework import filters
+
+# `pg_trgm.similarity_threshold` the `%` operator compares with, left at the
+# default of the extension
+TRIGRAM_OPERATOR_THRESHOLD = 0.3
+
+
+class AdSearchFilter(filters.SearchFilter):
+    """
+    Ad search with three modes selected by the `search_mode` query parameter.
+
+    - `fulltext` (default): every search word is matched as a prefix against the
+      GIN indexed `Ad.search_vector`, results are ordered by weighted rank so title
+      matches come first.
+    - `fuzzy`: typo tolerant trigram similarity on the title, ordered by
+      similarity. The threshold is `ADS_SEARCH_SIMILARITY_THRESHOLD`.
+    - `prefix`: case-insensitive title prefix match for autocomplete.
+
+    `fulltext` and `fuzzy` need PostgreSQL, other databases fall back to
+    `SearchFilter` over `search_fields`.
+    """
+
+    search_config = "simple"
+    search_mode_param = "search_mode"
+    search_modes = ("fulltext", "fuzzy", "prefix")
+
+    def get_search_mode(self, request) -> str:
+        mode = request.query_params.get(self.search_mode_param, "")
+        return mode if mode in self.search_modes else self.search_modes[0]
+
+    @override
+    def filter_queryset(self, request, queryset, view):
+        mode = self.get_search_mode(request)
+        if mode == "prefix":
+            return self.filter_prefix(request, queryset)
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+        if mode == "fuzzy":
+            return self.filter_fuzzy(request, queryset)
+        return self.filter_fulltext(request, queryset)
+
+    def filter_fulltext(self, request, queryset):
+        words = [
+            word
+            for term in self.get_search_terms(request)
+            for word in re.findall(r"\w+", term)
+        ]
+        if not words:
+            return queryset
+
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            config=self.search_config,
+            search_type="raw",
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", "-created_at")
+        )
+
+    def filter_fuzzy(self, request, queryset):
+        text = " ".join(self.get_search_terms(request)).upper()
+        if not text:
+            return queryset
+
+        # the threshold is part of the query rather than a setting of the
+        # session, which a transaction pooler would hand to other clients
+        threshold = settings.ADS_SEARCH_SIMILARITY_THRESHOLD
+        queryset = queryset.alias(title_upper=Upper("title")).annotate(
+            similarity=TrigramSimilarity(Upper("title"), text)
+        )
+        if threshold >= TRIGRAM_OPERATOR_THRESHOLD:
+            # `%` narrows the rows down through the `ads_ad_title_trgm` index, a
+            # lower threshold has to look at every title
+            queryset = queryset.filter(title_upper__trigram_similar=text)
+        return queryset.filter(similarity__gt=threshold).order_by(
+            "-similarity", "-created_at"
+        )
+
+    def filter_prefix(self, request, queryset):
+        text = " ".join(self.get_search_terms(request))
+        if not text:
+            return queryset
+        return queryset.filter(title__istartswith=text)
+
+    @override
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.search_mode_param,
+                "required": False,
+                "in": "query",
+                "description": "Search mode: `fulltext` (default), `fuzzy` or "
+                "`prefix`.",
+                "schema": {"type": "string", "enum": list(self.search_modes)},
+            },
+        ]
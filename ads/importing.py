@@ -0,0 +1,268 @@
+import csv
+import json
+import multiprocessing
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import batched
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from rest_framework.exceptions import ValidationError
+
+from users.models import User
+
+from . import cache as ads_cache
+from .models import Ad
+from .serializers import AdImportSerializer
+
+# (line number, raw record) as read from the file, or the error that made the
+# line unreadable
+Record = tuple[int, dict | ValidationError]
+# (line number, validation errors)
+RowError = tuple[int, dict]
+
+MAX_REPORTED_ERRORS = 20
+
+
+def read_records(path: Path, file_format: str) -> Iterator[Record]:
+    """Streams records of an NDJSON or CSV file with their line numbers."""
+
+    with path.open(encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as exc:
+                yield number, ValidationError(
+                    {"non_field_errors": [f"Invalid JSON: {exc}"]}
+                )
+
+
+class Importer:
+    """
+    Validates one batch of records and inserts the valid ones.
+
+    Records are validated with `serializer_class`, authors are resolved from the
+    `author_email` of each record through a per-process email -> id cache, and
+    rows are written with `bulk_create` or, on PostgreSQL, with `COPY`.
+    """
+
+    model = None
+    serializer_class = None
+    # columns left to their database default or trigger by `COPY`
+    copy_exclude = ("id",)
+
+    def __init__(self, method: str = "bulk") -> None:
+        self.method = method
+        self._author_ids: dict[str, int | None] = {}
+
+    def import_batch(self, records: list[Record]) -> tuple[int, list[RowError]]:
+        valid, errors = self.validate(records)
+        objects = self.build(valid, errors)
+        if objects:
+            with transaction.atomic():
+                self.before_write(objects)
+                self.write(objects)
+                self.after_write(objects)
+        return len(objects), errors
+
+    def validate(self, records: list[Record]) -> tuple[list[Record], list[RowError]]:
+        serializer = self.serializer_class()
+        valid, errors = [], []
+        for number, record in records:
+            if isinstance(record, ValidationError):
+                errors.append((number, record.detail))
+                continue
+            try:
+                valid.append((number, serializer.run_validation(record)))
+            except ValidationError as exc:
+                errors.append((number, exc.detail))
+        return valid, errors
+
+    def build(self, valid: list[Record], errors: list[RowError]) -> list:
+        author_ids = self.resolve_authors({attrs["author_email"] for _, attrs in valid})
+
+        objects = []
+        for number, attrs in valid:
+            author_id = author_ids.get(attrs.pop("author_email"))
+            if author_id is None:
+                errors.append((number, {"author_email": ["User does not exist."]}))
+                continue
+            objects.append(self.model(author_id=author_id, **attrs))
+        return objects
+
+    def resolve_authors(self, emails: set[str]) -> dict[str, int | None]:
+        if missing := emails - self._author_ids.keys():
+            self._author_ids |= dict.fromkeys(missing)
+            self._author_ids |= dict(
+                User.objects.filter(email__in=missing).values_list("email", "id")
+            )
+        return self._author_ids
+
+    def write(self, objects: list) -> None:
+        if self.method == "copy":
+            self.copy(objects)
+        else:
+            self.model.objects.bulk_create(objects, batch_size=len(objects))
+
+    def copy(self, objects: list) -> None:
+        fields = [
+            field
+            for field in self.model._meta.concrete_fields
+            if field.column not in self.copy_exclude
+        ]
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for obj in objects:
+                    # `pre_save` fills `auto_now` and `auto_now_add` fields
+                    copy.write_row([field.pre_save(obj, True) for field in fields])
+
+    def before_write(self, objects: list) -> None:
+        """Runs in the transaction of the batch, before its rows are written."""
+
+    def after_write(self, objects: list) -> None:
+        """Runs in the transaction of the batch, after its rows are written."""
+
+
+class AdImporter(Importer):
+    model = Ad
+    serializer_class = AdImportSerializer
+    copy_exclude = ("id", "search_vector")
+
+    def after_write(self, objects: list) -> None:
+        # bulk writes send no `post_save`, see `ads.signals`
+        transaction.on_commit(ads_cache.invalidate)
+
+
+_worker_importer: Importer | None = None
+
+
+def _init_worker(importer: Importer) -> None:
+    global _worker_importer
+    _worker_importer = importer
+
+
+def _import_batch(records: list[Record]) -> tuple[int, list[RowError]]:
+    return _worker_importer.import_batch(records)
+
+
+class BaseImportCommand(BaseCommand):
+    """Streams an NDJSON or CSV file through `importer_class` in batches."""
+
+    importer_class = Importer
+    label = "rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="NDJSON or CSV file to import.")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=("ndjson", "csv"),
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows validated and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=("bulk", "copy"),
+            default="bulk",
+            help="Insert with `bulk_create` or with `COPY` (PostgreSQL only).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes importing batches in parallel.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+        if options["method"] == "copy" and connection.vendor != "postgresql":
+            raise CommandError("`--method copy` needs PostgreSQL.")
+
+        file_format = options["file_format"] or (
+            "csv" if path.suffix.lower() == ".csv" else "ndjson"
+        )
+        batches = batched(read_records(path, file_format), options["batch_size"])
+        importer = self.importer_class(options["method"])
+
+        self.started = time.monotonic()
+        self.imported, self.errors = 0, []
+        if options["workers"] > 1:
+            results = self.run_parallel(importer, batches, options["workers"])
+        else:
+            results = (importer.import_batch(list(batch)) for batch in batches)
+        for imported, errors in results:
+            self.imported += imported
+            self.errors += errors
+            self.report_progress(options["verbosity"])
+
+        self.report_errors()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} {self.label}, skipped {len(self.errors)} "
+                f"invalid in {self.elapsed:.1f}s ({self.rate:.0f} rows/s)."
+            )
+        )
+
+    def run_parallel(
+        self, importer: Importer, batches: Iterable, workers: int
+    ) -> Iterator[tuple[int, list[RowError]]]:
+        # forked workers must not share the connections of this process
+        connections.close_all()
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(importer,),
+        ) as executor:
+            # a bounded number of batches in flight keeps memory use constant
+            pending = set()
+            for batch in batches:
+                pending.add(executor.submit(_import_batch, list(batch)))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+            for future in pending:
+                yield future.result()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        return (self.imported + len(self.errors)) / max(self.elapsed, 1e-9)
+
+    def report_progress(self, verbosity: int) -> None:
+        if verbosity > 0:
+            self.stdout.write(
+                f"{self.imported} {self.label} imported, {len(self.errors)} "
+                f"invalid, {self.rate:.0f} rows/s"
+            )
+
+    def report_errors(self) -> None:
+        for number, errors in sorted(self.errors)[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f"line {number}: {json.dumps(errors)}")
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(
+                f"... and {len(self.errors) - MAX_REPORTED_ERRORS} more invalid rows"
+            )
@@ -0,0 +1,10 @@
+from ads.importing import AdImporter, BaseImportCommand
+
+
+class Command(BaseImportCommand):
+    help = (
+        "Imports ads from an NDJSON or CSV file with `title`, `price`, "
+        "`description` and `author_email` columns."
+    )
+    importer_class = AdImporter
+    label = "ads"
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="ads_ad_search__865551_gin"
+)
+
+# Keeps `search_vector` in sync on every write path, including `bulk_create`,
+# `QuerySet.update` and raw SQL, so the application never has to maintain it.
+CREATE_TRIGGER = [
+    """
+    CREATE FUNCTION ads_ad_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER ads_ad_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON ads_ad
+    FOR EACH ROW EXECUTE FUNCTION ads_ad_search_vector_update();
+    """,
+    """
+    UPDATE ads_ad SET search_vector =
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B');
+    """,
+]
+
+DROP_TRIGGER = [
+    "DROP TRIGGER IF EXISTS ads_ad_search_vector_trigger ON ads_ad;",
+    "DROP FUNCTION IF EXISTS ads_ad_search_vector_update();",
+]
+
+
+def create_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in CREATE_TRIGGER:
+        schema_editor.execute(sql)
+    schema_editor.add_index(apps.get_model("ads", "Ad"), SEARCH_VECTOR_INDEX)
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("ads", "Ad"), SEARCH_VECTOR_INDEX)
+    for sql in DROP_TRIGGER:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0002_alter_ad_options_alter_ad_author_alter_ad_created_at_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Weighted full-text vector of the title and description, "
+                "maintained by a database trigger (PostgreSQL only).",
+                null=True,
+            ),
+        ),
+        # The GIN index and the trigger only exist on PostgreSQL, other backends
+        # (SQLite in tests) keep the column empty and search falls back to
+        # ILIKE. The index stays out of the migration state on purpose: SQLite
+        # recreates every state index whenever it rebuilds the table.
+        migrations.RunPython(create_search_vector_index, drop_search_vector_index),
+    ]
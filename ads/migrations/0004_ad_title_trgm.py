@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+TITLE_TRGM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper("title"), name="gin_trgm_ops"
+    ),
+    name="ads_ad_title_trgm",
+)
+
+
+def create_title_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("ads", "Ad"), TITLE_TRGM_INDEX)
+
+
+def drop_title_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("ads", "Ad"), TITLE_TRGM_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0003_ad_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # No-op on databases other than PostgreSQL.
+        TrigramExtension(),
+        # Database only, see 0003_ad_search_vector.
+        migrations.RunPython(create_title_trgm_index, drop_title_trgm_index),
+    ]
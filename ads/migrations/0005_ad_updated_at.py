@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    Ad.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0004_ad_title_trgm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="The date and time the ad was last changed."
+            ),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
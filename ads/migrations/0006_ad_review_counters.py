@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_counters(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    Review = apps.get_model("reviews", "Review")
+
+    reviews = Review.objects.filter(ad=models.OuterRef("pk")).order_by()
+    Ad.objects.update(
+        reviews_count=Coalesce(
+            models.Subquery(
+                reviews.values("ad").annotate(count=models.Count("pk")).values("count")
+            ),
+            0,
+        ),
+        last_review_at=models.Subquery(
+            reviews.order_by("-created_at").values("created_at")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0005_ad_updated_at"),
+        ("reviews", "0002_alter_review_options_alter_review_ad_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="last_review_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="The date and time of the latest review on the ad.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="reviews_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="The number of reviews on the ad."
+            ),
+        ),
+        migrations.RunPython(backfill_review_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,124 @@
+import hashlib
+from datetime import datetime
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django import shortcuts
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+async def aget_object_or_404(queryset, *args, **kwargs):
+    """Async `rest_framework.generics.get_object_or_404`."""
+
+    try:
+        return await shortcuts.aget_object_or_404(queryset, *args, **kwargs)
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+
+
+class AsyncViewSetMixin:
+    """
+    Async handlers for viewsets served under ASGI.
+
+    With `ASYNC_VIEWS` on, the views of the viewset are coroutines: an action
+    with an `a`-prefixed coroutine counterpart, like `alist` for `list`, is
+    awaited on the event loop, while authentication, permission checks and
+    every other action run in a worker thread as under WSGI. With it off (the
+    default, for WSGI servers) the viewset is fully synchronous.
+    """
+
+    # set on the instances of async views by `as_view`
+    async_dispatch = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if not settings.ASYNC_VIEWS:
+            return super().as_view(actions, **initkwargs)
+
+        view = super().as_view(actions, async_dispatch=True, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            # `dispatch` returns the coroutine of `adispatch`
+            return await view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_dispatch:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """`APIView.dispatch` that awaits the async handler of the action."""
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if async_handler := getattr(self, f"a{self.action}", None):
+                response = await async_handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        """`get_object` with the async ORM."""
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = await aget_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET support for viewsets.
+
+    Views compute the validators of a representation from a cheap query (a single
+    `updated_at` column or an aggregate), call `get_not_modified` before anything
+    is serialized and `set_validators` on the full response.
+    """
+
+    def make_etag(self, *parts) -> str:
+        """Strong ETag of the given parts and the negotiated renderer format."""
+
+        renderer = getattr(self.request, "accepted_renderer", None)
+        parts = (*parts, renderer.format if renderer else None)
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def get_not_modified(self, etag: str, last_modified: datetime | None):
+        """Returns a 304 (or 412) response if the client's copy is still valid."""
+
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+
+    def set_validators(self, response, etag: str, last_modified: datetime | None):
+        response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 User = get_user_model()
@@ -19,6 +20,24 @@ class Ad(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, help_text="The date and time the ad was created."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="The date and time the ad was last changed."
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of reviews on the ad."
+    )
+    last_review_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The date and time of the latest review on the ad.",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text="Weighted full-text vector of the title and description, "
+        "maintained by a database trigger (PostgreSQL only).",
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -26,6 +45,9 @@ class Ad(models.Model):
             models.Index(fields=["author"]),
             models.Index(fields=["created_at"]),
         ]
+        # PostgreSQL-only GIN indexes on `search_vector` and on `UPPER(title)`
+        # (trigram) are created by migrations 0003 and 0004, outside of the
+        # migration state, so SQLite can still rebuild the table.
         verbose_name = "Ad"
         verbose_name_plural = "Ads"
 
@@ -1,7 +1,184 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import datetime
+from typing import override
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class AdPagination(PageNumberPagination):
     page_size = 4
     page_size_query_param = "page_size"
     max_page_size = 4
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` with the count and the page read by the async ORM."""
+
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # counted ahead, `Paginator.page` then only slices the queryset lazily
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return self.page.object_list
+
+
+def approximate_count(queryset) -> int:
+    """
+    Returns the planner's row estimate for the queryset on PostgreSQL.
+
+    Small estimates are not reliable, so below `ADS_APPROXIMATE_COUNT_THRESHOLD`
+    (and on other databases) an exact `COUNT(*)` is returned instead.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate < settings.ADS_APPROXIMATE_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class AdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over `(created_at, id)`.
+
+    Every page is a single indexed range query, there is no `OFFSET` and no
+    `COUNT(*)`, so the cost does not grow with the depth of the page.
+    """
+
+    page_size = 4
+    page_size_query_param = "page_size"
+    max_page_size = 4
+    ordering = ("-created_at", "-id")
+
+    @override
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        self.count = None
+        if settings.ADS_FEED_APPROXIMATE_COUNT:
+            self.count = approximate_count(queryset)
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` with the page read by the async ORM."""
+
+        page_queryset = self.get_page_queryset(queryset, request)
+        self.count = None
+        if settings.ADS_FEED_APPROXIMATE_COUNT:
+            self.count = await sync_to_async(approximate_count)(queryset)
+        return self.set_page([ad async for ad in page_queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """The queryset of the requested page and one more row, not evaluated."""
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+
+        if self.cursor is not None:
+            created_at, pk = self._parse_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results: list) -> list:
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        return self.page
+
+    @override
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is not None and cursor.position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _parse_position(self, position: str) -> tuple[datetime, int]:
+        try:
+            created_at, pk = position.rsplit("|", 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position(self, ad) -> str:
+        return f"{ad.created_at.isoformat()}|{ad.pk}"
+
+    @override
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    @override
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position(self.page[0])
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    @override
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count is not None:
+            payload = {"count": self.count, **payload}
+        return Response(payload)
+
+    @override
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "count": {"type": "integer", "example": 123},
+            **response_schema["properties"],
+        }
+        return response_schema
@@ -8,4 +8,4 @@ class IsAdAuthor(BasePermission):
 
     @override
     def has_object_permission(self, request, view, ad) -> bool:
-        return ad.author == request.user
+        return ad.author_id == request.user.pk
@@ -1,10 +1,144 @@
+from typing import override
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
 from .models import Ad
 
 
+class AdListSerializer(serializers.ListSerializer):
+    """
+    Bulk create and bulk update of ads.
+
+    Rows are written with `bulk_create`/`bulk_update` in chunks of
+    `ADS_BULK_BATCH_SIZE`. To update, pass the queryset of ads the user may change
+    as `instance`, every item then needs the `id` of one of them. Errors of the
+    items are keyed by their index.
+    """
+
+    default_error_messages = {
+        "not_found": "Ad {pk} does not exist or can not be changed.",
+        "duplicate": "Ad {pk} is listed more than once.",
+        "missing_id": "An integer `id` is required.",
+    }
+
+    @override
+    def to_internal_value(self, data):
+        self._ads, self._seen = {}, set()
+        if self.instance is not None and isinstance(data, list):
+            pks = [item.get("id") for item in data if isinstance(item, dict)]
+            self._ads = self.instance.in_bulk([pk for pk in pks if isinstance(pk, int)])
+        try:
+            return super().to_internal_value(data)
+        except serializers.ValidationError as exc:
+            if not isinstance(exc.detail, list):
+                raise
+            # keyed by item index, without an empty entry for every valid item
+            raise serializers.ValidationError(
+                {index: errors for index, errors in enumerate(exc.detail) if errors}
+            )
+
+    @override
+    def run_child_validation(self, data):
+        if self.instance is None or not isinstance(data, dict):
+            return super().run_child_validation(data)
+
+        pk = data.get("id")
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            self.fail_item("missing_id")
+        if pk in self._seen:
+            self.fail_item("duplicate", pk=pk)
+        if pk not in self._ads:
+            self.fail_item("not_found", pk=pk)
+        self._seen.add(pk)
+
+        self.child.instance = self._ads[pk]
+        self.child.initial_data = data
+        return {**super().run_child_validation(data), "id": pk}
+
+    def fail_item(self, key, **kwargs):
+        message = self.error_messages[key].format(**kwargs)
+        raise serializers.ValidationError({"id": [message]}, code=key)
+
+    @override
+    def create(self, validated_data):
+        return Ad.objects.bulk_create(
+            [Ad(**attrs) for attrs in validated_data],
+            batch_size=settings.ADS_BULK_BATCH_SIZE,
+        )
+
+    @override
+    def update(self, instance, validated_data):
+        # `bulk_update` does not run `pre_save`, so `auto_now` is set by hand
+        now = timezone.now()
+        ads, fields = [], {"updated_at"}
+        for attrs in validated_data:
+            ad = self._ads[attrs.pop("id")]
+            for attr, value in attrs.items():
+                setattr(ad, attr, value)
+            ad.updated_at = now
+            fields.update(attrs)
+            ads.append(ad)
+
+        Ad.objects.bulk_update(ads, fields, batch_size=settings.ADS_BULK_BATCH_SIZE)
+        return ads
+
+
 class AdSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ad
-        fields = ("id", "title", "price", "description", "author", "created_at")
-        read_only_fields = ("author", "created_at")
+        list_serializer_class = AdListSerializer
+        fields = (
+            "id",
+            "title",
+            "price",
+            "description",
+            "author",
+            "reviews_count",
+            "last_review_at",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = (
+            "author",
+            "reviews_count",
+            "last_review_at",
+            "created_at",
+            "updated_at",
+        )
+
+
+class AdSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+
+
+class CacheCountersSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+
+
+class AdCacheStatsSerializer(serializers.Serializer):
+    list = CacheCountersSerializer()
+    retrieve = CacheCountersSerializer()
+
+
+class AdExportParamsSerializer(serializers.Serializer):
+    export_format = serializers.ChoiceField(choices=("ndjson", "csv"), default="ndjson")
+    created_after = serializers.DateTimeField(
+        required=False, help_text="Only ads created at or after this moment."
+    )
+    created_before = serializers.DateTimeField(
+        required=False, help_text="Only ads created before this moment."
+    )
+
+
+class AdImportSerializer(serializers.ModelSerializer):
+    """One row of `manage.py import_ads`, the author is given by email."""
+
+    author_email = serializers.EmailField()
+
+    class Meta:
+        model = Ad
+        fields = ("title", "price", "description", "author_email")
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache as ads_cache
+from .models import Ad
+from .suggest import title_index
+
+
+@receiver(post_save, sender=Ad)
+def index_ad_title(sender, instance, **kwargs) -> None:
+    pk, title = instance.pk, instance.title
+    transaction.on_commit(lambda: title_index.add(pk, title))
+
+
+@receiver(post_delete, sender=Ad)
+def unindex_ad_title(sender, instance, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: title_index.remove(pk))
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def invalidate_cached_ad(sender, instance, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: ads_cache.invalidate(pk))
@@ -0,0 +1,91 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .models import Ad
+
+
+class TitleIndex:
+    """
+    In-process prefix index of ad titles for autocomplete.
+
+    Titles are kept as a sorted list of `(casefolded title, id)` keys, so a lookup
+    is a binary search followed by a scan of the matching run. The index is built
+    lazily from the newest `ADS_SUGGEST_MAX_ENTRIES` ads, which caps its memory,
+    and is updated incrementally from `Ad` signals. Writes made by other processes
+    are picked up by a full rebuild every `ADS_SUGGEST_TTL` seconds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drops the index, the next lookup rebuilds it from the database."""
+
+        with self._lock:
+            self._keys: list[tuple[str, int]] = []
+            # id -> title, in insertion order, so the oldest entry comes first
+            self._titles: dict[int, str] = {}
+            self._built_at: float | None = None
+
+    def search(self, prefix: str, limit: int) -> list[dict]:
+        prefix = prefix.casefold()
+        with self._lock:
+            self._ensure_built()
+
+            suggestions = []
+            position = bisect_left(self._keys, (prefix,))
+            for key, pk in self._keys[position : position + limit]:
+                if not key.startswith(prefix):
+                    break
+                suggestions.append({"id": pk, "title": self._titles[pk]})
+            return suggestions
+
+    def add(self, pk: int, title: str) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            if pk in self._titles:
+                self._discard(self._titles[pk], pk)
+            else:
+                self._evict(settings.ADS_SUGGEST_MAX_ENTRIES - 1)
+            self._titles[pk] = title
+            insort(self._keys, (title.casefold(), pk))
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            if self._built_at is None or pk not in self._titles:
+                return
+            self._discard(self._titles.pop(pk), pk)
+
+    def _ensure_built(self) -> None:
+        if (
+            self._built_at is not None
+            and time.monotonic() - self._built_at < settings.ADS_SUGGEST_TTL
+        ):
+            return
+
+        newest = Ad.objects.order_by("-created_at", "-id").values_list("id", "title")
+        rows = list(newest[: settings.ADS_SUGGEST_MAX_ENTRIES])
+        rows.reverse()
+
+        self._titles = dict(rows)
+        self._keys = sorted((title.casefold(), pk) for pk, title in rows)
+        self._built_at = time.monotonic()
+
+    def _discard(self, title: str, pk: int) -> None:
+        key = (title.casefold(), pk)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def _evict(self, size: int) -> None:
+        while len(self._titles) > size:
+            pk = next(iter(self._titles))
+            self._discard(self._titles.pop(pk), pk)
+
+
+title_index = TitleIndex()
@@ -0,0 +1,73 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from ads.models import Ad
+
+# import_ads
+
+
+@pytest.fixture
+def ad_rows(user, ad_data) -> list[dict]:
+    return [
+        ad_data | {"title": f"Imported {i}", "author_email": user.email}
+        for i in range(5)
+    ]
+
+
+@pytest.mark.django_db
+def test_import_ads_ndjson(tmp_path, user, ad_rows):
+    path = tmp_path / "ads.ndjson"
+    lines = [json.dumps(row) for row in ad_rows]
+    lines[1:1] = [
+        json.dumps(ad_rows[0] | {"price": "free"}),
+        json.dumps(ad_rows[0] | {"author_email": "nobody@nowhere.com"}),
+        "{not json",
+        "",
+    ]
+    path.write_text("\n".join(lines))
+    stdout, stderr = StringIO(), StringIO()
+
+    call_command("import_ads", path, batch_size=2, stdout=stdout, stderr=stderr)
+
+    assert list(Ad.objects.order_by("id").values_list("title", flat=True)) == [
+        row["title"] for row in ad_rows
+    ]
+    assert all(ad.author == user for ad in Ad.objects.all())
+    assert "Imported 5 ads, skipped 3 invalid" in stdout.getvalue()
+    assert "rows/s" in stdout.getvalue()
+    errors = stderr.getvalue()
+    assert "line 2:" in errors and "price" in errors
+    assert "line 3:" in errors and "author_email" in errors
+    assert "line 4:" in errors and "Invalid JSON" in errors
+
+
+@pytest.mark.django_db
+def test_import_ads_csv(tmp_path, user, ad_rows):
+    path = tmp_path / "ads.csv"
+    with path.open("w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=ad_rows[0].keys())
+        writer.writeheader()
+        writer.writerows(ad_rows)
+
+    call_command("import_ads", path, batch_size=2, verbosity=0)
+
+    assert Ad.objects.filter(author=user).count() == len(ad_rows)
+
+
+@pytest.mark.django_db
+def test_import_ads_copy_needs_postgresql(tmp_path, ad_rows):
+    path = tmp_path / "ads.ndjson"
+    path.write_text(json.dumps(ad_rows[0]))
+
+    with pytest.raises(CommandError):
+        call_command("import_ads", path, method="copy")
+
+
+@pytest.mark.django_db
+def test_import_ads_missing_file(tmp_path):
+    with pytest.raises(CommandError):
+        call_command("import_ads", tmp_path / "missing.ndjson")
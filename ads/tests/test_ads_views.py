@@ -1,14 +1,27 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from ads.models import Ad
+from ads.suggest import title_index
+from ads.views import AdViewSet
 
 # fixtures
 
 
 @pytest.fixture
 def ads(ad_factory) -> list[Ad]:
+    title_index.clear()
     return [
         ad_factory(title="A plush toy"),
         ad_factory(title="A plush toy 2"),
@@ -47,6 +60,161 @@ def test_ads_list_search(api_client, ads, user):
     assert response.data.get("count") == sum("plush toy" in ad.title for ad in ads)
 
 
+@pytest.mark.django_db
+def test_ads_list_search_prefix(api_client, ads):
+    response = api_client.get(
+        reverse("ads:ad-list"), {"search": "a plush", "search_mode": "prefix"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data.get("count") == sum(
+        ad.title.lower().startswith("a plush") for ad in ads
+    )
+
+
+@pytest.mark.django_db
+def test_ads_list_cursor_walks_whole_feed(api_client, ads):
+    url = reverse("ads:ad-list") + "?pagination=cursor&page_size=2"
+    seen = []
+    while url:
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "count" not in response.data
+        seen += [item["id"] for item in response.data["results"]]
+        url = response.data["next"]
+
+    assert seen == [ad.id for ad in sorted(ads, key=lambda ad: ad.id, reverse=True)]
+
+
+@pytest.mark.django_db
+def test_ads_list_cursor_previous_page(api_client, ads):
+    response = api_client.get(
+        reverse("ads:ad-list"), {"pagination": "cursor", "page_size": 2}
+    )
+    first_page = response.data["results"]
+    assert response.data["previous"] is None
+
+    response = api_client.get(response.data["next"])
+    response = api_client.get(response.data["previous"])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"] == first_page
+
+
+@pytest.mark.django_db
+def test_ads_list_cursor_invalid(api_client, ads):
+    response = api_client.get(
+        reverse("ads:ad-list"), {"pagination": "cursor", "cursor": "WRONG"}
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_ads_list_cursor_approximate_count(api_client, ads, settings):
+    settings.ADS_FEED_APPROXIMATE_COUNT = True
+    response = api_client.get(reverse("ads:ad-list"), {"pagination": "cursor"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data.get("count") == len(ads)
+
+
+@pytest.mark.django_db
+def test_ads_list_cached(api_client, ads, django_assert_num_queries):
+    first = api_client.get(reverse("ads:ad-list"), {"page": 1})
+
+    with django_assert_num_queries(0):
+        second = api_client.get(reverse("ads:ad-list"), {"page": 1})
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.data == first.data
+
+
+@pytest.mark.django_db
+def test_ads_list_cache_invalidated_on_write(
+    api_client, ads, ad_factory, django_capture_on_commit_callbacks
+):
+    api_client.get(reverse("ads:ad-list"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ad_factory()
+    response = api_client.get(reverse("ads:ad-list"))
+
+    assert response.data.get("count") == len(ads) + 1
+
+
+# cache stats
+
+
+@pytest.mark.django_db
+def test_ads_cache_stats_as_admin_success(api_client, ads, admin):
+    api_client.get(reverse("ads:ad-list"))
+    api_client.get(reverse("ads:ad-list"))
+
+    api_client.force_authenticate(admin)
+    response = api_client.get(reverse("ads:ad-cache-stats"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["list"] == {"hits": 1, "misses": 1}
+    assert response.data["retrieve"] == {"hits": 0, "misses": 0}
+
+
+@pytest.mark.django_db
+def test_ads_cache_stats_as_user_fail(api_client, user):
+    api_client.force_authenticate(user)
+    response = api_client.get(reverse("ads:ad-cache-stats"))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+# suggest
+
+
+@pytest.mark.django_db
+def test_ads_suggest_success(api_client, ads):
+    response = api_client.get(reverse("ads:ad-suggest"), {"q": "a PLUSH"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == [
+        {"id": ad.id, "title": ad.title}
+        for ad in sorted(ads, key=lambda ad: ad.title)
+        if ad.title.lower().startswith("a plush")
+    ]
+
+
+@pytest.mark.django_db
+def test_ads_suggest_empty_query(api_client, ads):
+    response = api_client.get(reverse("ads:ad-suggest"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == []
+
+
+@pytest.mark.django_db
+def test_ads_suggest_follows_writes(
+    api_client, ads, ad_factory, django_capture_on_commit_callbacks
+):
+    api_client.get(reverse("ads:ad-suggest"), {"q": "a"})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        new_ad = ad_factory(title="A plush bear")
+        ads[0].delete()
+
+    response = api_client.get(reverse("ads:ad-suggest"), {"q": "a plush"})
+
+    assert [item["id"] for item in response.data] == [new_ad.id, ads[1].id]
+
+
+@pytest.mark.django_db
+def test_ads_suggest_memory_cap(api_client, ads, settings):
+    settings.ADS_SUGGEST_MAX_ENTRIES = 2
+    title_index.clear()
+    response = api_client.get(reverse("ads:ad-suggest"), {"q": "a"})
+
+    assert len(response.data) <= 2
+
+
 # create
 
 
@@ -94,6 +262,53 @@ def test_ads_retrieve_success(api_client, ad):
     assert response.data.get("id") == ad.id
 
 
+@pytest.mark.django_db
+def test_ads_retrieve_not_modified(api_client, ad):
+    api_client.force_authenticate(ad.author)
+    response = api_client.get(reverse("ads:ad-detail", args=[ad.id]))
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+
+    # the second and third requests are served from the response cache
+    for headers in (
+        {"HTTP_IF_NONE_MATCH": etag},
+        {"HTTP_IF_MODIFIED_SINCE": last_modified},
+    ):
+        response = api_client.get(reverse("ads:ad-detail", args=[ad.id]), **headers)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not response.content
+
+
+@pytest.mark.django_db
+def test_ads_retrieve_modified(api_client, ad):
+    api_client.force_authenticate(ad.author)
+    etag = api_client.get(reverse("ads:ad-detail", args=[ad.id]))["ETag"]
+
+    ad.title = "UPDATED"
+    ad.save()
+    cache.clear()
+    response = api_client.get(
+        reverse("ads:ad-detail", args=[ad.id]), HTTP_IF_NONE_MATCH=etag
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_ads_retrieve_cache_invalidated_on_update(
+    api_client, ad, django_capture_on_commit_callbacks
+):
+    api_client.force_authenticate(ad.author)
+    api_client.get(reverse("ads:ad-detail", args=[ad.id]))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.patch(reverse("ads:ad-detail", args=[ad.id]), {"title": "UPDATED"})
+    response = api_client.get(reverse("ads:ad-detail", args=[ad.id]))
+
+    assert response.data.get("title") == "UPDATED"
+
+
 # update
 
 
@@ -180,3 +395,359 @@ def test_ads_delete_as_admin_success(api_client, ad, admin):
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert not Ad.objects.filter(id=ad.id).exists()
+
+
+# bulk
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_unauthenticated(api_client, ad_data):
+    response = api_client.post(reverse("ads:ad-bulk-create"), [ad_data], format="json")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert not Ad.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_success(api_client, user, ad_data, settings):
+    settings.ADS_BULK_BATCH_SIZE = 2
+    items = [ad_data | {"title": f"Bulk {i}"} for i in range(5)]
+
+    api_client.force_authenticate(user)
+    response = api_client.post(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [item["title"] for item in response.data] == [
+        item["title"] for item in items
+    ]
+    assert all(item["id"] for item in response.data)
+    assert Ad.objects.filter(author=user).count() == len(items)
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_ndjson(api_client, user, ad_data):
+    body = "\n".join(json.dumps(ad_data | {"title": f"Bulk {i}"}) for i in range(3))
+
+    api_client.force_authenticate(user)
+    response = api_client.post(
+        reverse("ads:ad-bulk-create"), body, content_type="application/x-ndjson"
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Ad.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_ndjson_malformed(api_client, user, ad_data):
+    body = json.dumps(ad_data) + "\n{not json\n"
+
+    api_client.force_authenticate(user)
+    response = api_client.post(
+        reverse("ads:ad-bulk-create"), body, content_type="application/x-ndjson"
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "line 2" in response.data["detail"]
+    assert not Ad.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_reports_errors_per_item(api_client, user, ad_data):
+    items = [ad_data, ad_data | {"price": "free"}, ad_data, {"title": ""}]
+
+    api_client.force_authenticate(user)
+    response = api_client.post(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {1, 3}
+    assert "price" in response.data[1]
+    assert not Ad.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_too_many_items(api_client, user, ad_data, settings):
+    settings.ADS_BULK_MAX_ITEMS = 2
+
+    api_client.force_authenticate(user)
+    response = api_client.post(
+        reverse("ads:ad-bulk-create"), [ad_data] * 3, format="json"
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Ad.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_queries_do_not_grow(
+    api_client, user, ad_data, django_assert_num_queries
+):
+    api_client.force_authenticate(user)
+    # savepoint + insert + release
+    for size in (1, 50):
+        with django_assert_num_queries(3):
+            api_client.post(
+                reverse("ads:ad-bulk-create"), [ad_data] * size, format="json"
+            )
+
+
+@pytest.mark.django_db
+def test_ads_bulk_create_follows_into_list_and_suggest(
+    api_client, ads, user, ad_data, django_capture_on_commit_callbacks
+):
+    api_client.get(reverse("ads:ad-list"))
+    api_client.get(reverse("ads:ad-suggest"), {"q": "a"})
+
+    api_client.force_authenticate(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(
+            reverse("ads:ad-bulk-create"),
+            [ad_data | {"title": "Bulk bear"}],
+            format="json",
+        )
+
+    response = api_client.get(reverse("ads:ad-list"))
+    assert response.data["count"] == len(ads) + 1
+    response = api_client.get(reverse("ads:ad-suggest"), {"q": "bulk"})
+    assert [item["title"] for item in response.data] == ["Bulk bear"]
+
+
+@pytest.mark.django_db
+def test_ads_bulk_update_as_author_success(api_client, ads, user):
+    items = [{"id": ads[0].id, "title": "UPDATED"}, {"id": ads[1].id, "price": 1}]
+
+    api_client.force_authenticate(user)
+    response = api_client.patch(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    ads[0].refresh_from_db()
+    ads[1].refresh_from_db()
+    assert ads[0].title == "UPDATED"
+    assert ads[1].price == 1
+    assert ads[1].updated_at > ads[1].created_at
+
+
+@pytest.mark.django_db
+def test_ads_bulk_update_as_random_user_fail(api_client, ads, random_user):
+    items = [{"id": ads[0].id, "title": "UPDATED"}]
+
+    api_client.force_authenticate(random_user)
+    response = api_client.patch(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "id" in response.data[0]
+    ads[0].refresh_from_db()
+    assert ads[0].title != "UPDATED"
+
+
+@pytest.mark.django_db
+def test_ads_bulk_update_as_admin_success(api_client, ads, admin):
+    items = [{"id": ads[0].id, "title": "UPDATED"}]
+
+    api_client.force_authenticate(admin)
+    response = api_client.patch(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    ads[0].refresh_from_db()
+    assert ads[0].title == "UPDATED"
+
+
+@pytest.mark.django_db
+def test_ads_bulk_update_reports_errors_per_item(api_client, ads, user):
+    items = [
+        {"id": ads[0].id, "title": "UPDATED"},
+        {"title": "UPDATED"},
+        {"id": ads[0].id, "price": 1},
+        {"id": ads[1].id, "price": -1},
+    ]
+
+    api_client.force_authenticate(user)
+    response = api_client.patch(reverse("ads:ad-bulk-create"), items, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {1, 2, 3}
+    ads[0].refresh_from_db()
+    assert ads[0].title != "UPDATED"
+
+
+# export
+
+
+@pytest.mark.django_db
+def test_ads_export_as_user_fail(api_client, ads, user):
+    api_client.force_authenticate(user)
+    response = api_client.get(reverse("ads:ad-export"))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_ads_export_ndjson(api_client, ads, admin):
+    api_client.force_authenticate(admin)
+    response = api_client.get(reverse("ads:ad-export"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"].startswith("application/x-ndjson")
+    lines = [
+        json.loads(line) for line in b"".join(response.streaming_content).splitlines()
+    ]
+    assert [line["id"] for line in lines] == [ad.id for ad in ads]
+
+    detail = api_client.get(reverse("ads:ad-detail", args=[ads[0].id])).data
+    assert lines[0] == dict(detail)
+
+
+@pytest.mark.django_db
+def test_ads_export_csv(api_client, ads, admin, settings):
+    settings.ADS_EXPORT_CHUNK_SIZE = 2
+
+    api_client.force_authenticate(admin)
+    response = api_client.get(reverse("ads:ad-export"), {"export_format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"].startswith("text/csv")
+    content = b"".join(response.streaming_content).decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [int(row["id"]) for row in rows] == [ad.id for ad in ads]
+    assert rows[0]["title"] == ads[0].title
+    assert rows[0]["last_review_at"] == ""
+
+
+@pytest.mark.django_db
+def test_ads_export_without_server_side_cursors(
+    api_client, ads, admin, settings, monkeypatch
+):
+    settings.ADS_EXPORT_CHUNK_SIZE = 2
+    connection = connections[Ad.objects.db]
+    monkeypatch.setitem(connection.settings_dict, "DISABLE_SERVER_SIDE_CURSORS", True)
+
+    api_client.force_authenticate(admin)
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse("ads:ad-export"))
+        lines = b"".join(response.streaming_content).splitlines()
+
+    assert [json.loads(line)["id"] for line in lines] == [ad.id for ad in ads]
+    assert sum("LIMIT 2" in query["sql"] for query in queries) == 3
+
+
+@pytest.mark.django_db
+def test_ads_export_created_range(api_client, ads, admin):
+    created = [timezone.now() - timedelta(days=days) for days in (5, 4, 3, 2, 1)]
+    for ad, created_at in zip(ads, created):
+        Ad.objects.filter(id=ad.id).update(created_at=created_at)
+
+    api_client.force_authenticate(admin)
+    response = api_client.get(
+        reverse("ads:ad-export"),
+        {
+            "created_after": created[1].isoformat(),
+            "created_before": created[3].isoformat(),
+        },
+    )
+
+    lines = b"".join(response.streaming_content).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [ads[1].id, ads[2].id]
+
+
+@pytest.mark.django_db
+def test_ads_export_invalid_params(api_client, admin):
+    api_client.force_authenticate(admin)
+    response = api_client.get(
+        reverse("ads:ad-export"), {"export_format": "xml", "created_after": "soon"}
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {"export_format", "created_after"}
+
+
+# async
+
+
+@pytest.mark.django_db
+def test_ads_async_export(ads, admin, settings, call_async_view):
+    settings.ADS_EXPORT_CHUNK_SIZE = 2
+    response = call_async_view(AdViewSet, "get", "export", user=admin)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.is_async
+
+    async def read():
+        return [chunk async for chunk in response.streaming_content]
+
+    chunks = async_to_sync(read)()
+    assert len(chunks) == 3
+    lines = b"".join(chunks).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [ad.id for ad in ads]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {"page": "last"}, {"pagination": "cursor"}])
+def test_ads_async_list_matches_sync(api_client, ads, call_async_view, params):
+    expected = api_client.get(reverse("ads:ad-list"), params).data
+
+    response = call_async_view(AdViewSet, "get", "list", params)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"] == expected["results"]
+    assert response.data.get("count") == expected.get("count")
+
+
+@pytest.mark.django_db
+def test_ads_async_list_invalid_page(ads, call_async_view):
+    response = call_async_view(AdViewSet, "get", "list", {"page": 100})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_ads_async_retrieve(ad, call_async_view):
+    assert (
+        call_async_view(AdViewSet, "get", "retrieve", pk=ad.id).status_code
+        == status.HTTP_401_UNAUTHORIZED
+    )
+
+    response = call_async_view(AdViewSet, "get", "retrieve", user=ad.author, pk=ad.id)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["id"] == ad.id
+
+    # served from the response cache
+    response = call_async_view(
+        AdViewSet,
+        "get",
+        "retrieve",
+        user=ad.author,
+        pk=ad.id,
+        headers={"If-None-Match": response["ETag"]},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = call_async_view(AdViewSet, "get", "retrieve", user=ad.author, pk=0)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_ads_async_mode_runs_sync_actions(user, ad_data, call_async_view):
+    response = call_async_view(AdViewSet, "post", "create", ad_data, user=user)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Ad.objects.filter(author=user).count() == 1
+
+
+# query counts
+
+
+@pytest.mark.django_db
+def test_ads_queries_per_action(api_client, ad, ad_data, assert_action_queries):
+    detail_url = reverse("ads:ad-detail", args=[ad.id])
+
+    # count + page
+    assert_action_queries(2, "get", reverse("ads:ad-list"))
+
+    api_client.force_authenticate(ad.author)
+    # updated_at for validators + row
+    assert_action_queries(2, "get", detail_url)
+    assert_action_queries(1, "post", reverse("ads:ad-list"), ad_data)
+    # row + update, the author check does not load the author
+    assert_action_queries(2, "patch", detail_url, {"title": "UPDATED"})
+    # keys + cascade to reviews + delete
+    assert_action_queries(3, "delete", detail_url)
@@ -1,25 +1,66 @@
 from typing import override
 
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import filters, viewsets
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
 
 from users.permissions import IsRoleAdmin
 
+from . import cache as ads_cache
+from .export import aiter_lines, iter_csv, iter_ndjson
+from .filters import AdSearchFilter
+from .mixins import AsyncViewSetMixin, ConditionalGetMixin, aget_object_or_404
 from .models import Ad
-from .pagination import AdPagination
+from .pagination import AdCursorPagination, AdPagination
+from .parsers import NDJSONParser
 from .permissions import IsAdAuthor
-from .serializers import AdSerializer
+from .serializers import (
+    AdCacheStatsSerializer,
+    AdExportParamsSerializer,
+    AdSerializer,
+    AdSuggestionSerializer,
+)
+from .suggest import title_index
+
+SUGGEST_LIMIT = 10
+
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "csv": (iter_csv, "text/csv"),
+}
 
 
 @extend_schema(tags=["ads"])
 @extend_schema_view(
     list=extend_schema(
         summary="List all ads",
-        description="Retrieves a list of all ads. Supports search by title.",
+        description="Retrieves a list of all ads. Supports full-text search by "
+        "title and description. "
+        "Pass `pagination=cursor` to page through the feed with opaque cursors "
+        "instead of page numbers.",
+        parameters=[
+            OpenApiParameter(
+                "pagination",
+                str,
+                enum=["page", "cursor"],
+                description="Pagination mode, `page` by default.",
+            ),
+        ],
     ),
     retrieve=extend_schema(
-        summary="Retrieve an ad", description="Retrieves the details of a specific ad."
+        summary="Retrieve an ad",
+        description="Retrieves the details of a specific ad. Supports conditional "
+        "requests with `If-None-Match` and `If-Modified-Since`.",
     ),
     create=extend_schema(summary="Create a new ad", description="Creates a new ad."),
     update=extend_schema(summary="Update an ad", description="Updates an existing ad."),
@@ -29,27 +70,252 @@ from .serializers import AdSerializer
     ),
     destroy=extend_schema(summary="Delete an ad", description="Deletes an ad."),
 )
-class AdViewSet(viewsets.ModelViewSet):
-    queryset = Ad.objects.all()
+class AdViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Ad.objects.defer("search_vector")
     serializer_class = AdSerializer
     pagination_class = AdPagination
 
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (AdSearchFilter,)
     search_fields = ("title",)
 
+    @property
+    @override
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if request is not None and (
+                request.query_params.get("pagination") == "cursor"
+            ):
+                self._paginator = AdCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    @override
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "destroy":
+            # the permission check and the delete only need the keys
+            queryset = queryset.only("id", "author")
+        return queryset
+
     @override
     def get_permissions(self):
         match self.action:
-            case "list":
+            case "list" | "suggest":
                 permissions = [AllowAny]
-            case "create" | "retrieve":
+            case "create" | "retrieve" | "bulk_create" | "bulk_update":
                 permissions = [IsAuthenticated]
             case "update" | "partial_update" | "destroy":
                 permissions = [IsAuthenticated, IsAdAuthor | IsRoleAdmin]
+            case "cache_stats" | "export":
+                permissions = [IsAuthenticated, IsRoleAdmin]
             case _:
                 permissions = [IsAuthenticated]
         return [permission() for permission in permissions]
 
+    @override
+    def list(self, request, *args, **kwargs):
+        key = ads_cache.list_key(request)
+        data = ads_cache.get_payload("list", key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        ads_cache.set_payload(key, response.data)
+        return response
+
+    @override
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        key = ads_cache.detail_key(pk)
+        data = ads_cache.get_payload("retrieve", key)
+        if data is not None:
+            updated_at = parse_datetime(data["updated_at"])
+        else:
+            updated_at = get_object_or_404(
+                self.get_queryset().values_list("updated_at", flat=True), pk=pk
+            )
+
+        etag = self.make_etag(pk, updated_at.timestamp())
+        if not_modified := self.get_not_modified(etag, updated_at):
+            return not_modified
+
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            ads_cache.set_payload(key, data, pk=pk)
+        return self.set_validators(Response(data), etag, updated_at)
+
+    async def alist(self, request, *args, **kwargs):
+        key = await ads_cache.alist_key(request)
+        data = await ads_cache.aget_payload("list", key)
+        if data is not None:
+            return Response(data)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        await ads_cache.aset_payload(key, response.data)
+        return response
+
+    async def aretrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        key = await ads_cache.adetail_key(pk)
+        data = await ads_cache.aget_payload("retrieve", key)
+        if data is not None:
+            updated_at = parse_datetime(data["updated_at"])
+        else:
+            updated_at = await aget_object_or_404(
+                self.get_queryset().values_list("updated_at", flat=True), pk=pk
+            )
+
+        etag = self.make_etag(pk, updated_at.timestamp())
+        if not_modified := self.get_not_modified(etag, updated_at):
+            return not_modified
+
+        if data is None:
+            data = self.get_serializer(await self.aget_object()).data
+            await ads_cache.aset_payload(key, data, pk=pk)
+        return self.set_validators(Response(data), etag, updated_at)
+
     @override
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        return self.get_serializer(
+            *args,
+            many=True,
+            allow_empty=False,
+            max_length=settings.ADS_BULK_MAX_ITEMS,
+            **kwargs,
+        )
+
+    @extend_schema(
+        summary="Create ads in bulk",
+        description="Creates up to `ADS_BULK_MAX_ITEMS` ads in one transaction from "
+        "a JSON array or an `application/x-ndjson` body. Nothing is created if any "
+        "item is invalid, errors are reported by item index.",
+        request=AdSerializer(many=True),
+        responses={status.HTTP_201_CREATED: AdSerializer(many=True)},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk_create(self, request):
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            ads = serializer.save(author=request.user)
+            # `bulk_create` sends no `post_save`, see `ads.signals`
+            self.on_bulk_commit(ads, created=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Update ads in bulk",
+        description="Partially updates up to `ADS_BULK_MAX_ITEMS` ads in one "
+        "transaction, every item carries the `id` of its ad. Users can only change "
+        "their own ads, admins any ad. Nothing is changed if any item is invalid, "
+        "errors are reported by item index.",
+        request=AdSerializer(many=True),
+        responses=AdSerializer(many=True),
+    )
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        queryset = self.get_queryset()
+        if not request.user.is_admin():
+            queryset = queryset.filter(author=request.user)
+
+        serializer = self.get_bulk_serializer(queryset, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            ads = serializer.save()
+            # `bulk_update` sends no `post_save`, see `ads.signals`
+            self.on_bulk_commit(ads, created=False)
+        return Response(serializer.data)
+
+    def on_bulk_commit(self, ads, created: bool) -> None:
+        """Updates the title index and the response cache like `ads.signals`."""
+
+        titles = [(ad.pk, ad.title) for ad in ads]
+
+        def sync():
+            for pk, title in titles:
+                title_index.add(pk, title)
+            # new ads have no cached payloads, only the list pages are stale
+            ads_cache.invalidate(*([] if created else (pk for pk, _ in titles)))
+
+        transaction.on_commit(sync)
+
+    @extend_schema(
+        summary="Suggest ad titles",
+        description="Returns ids and titles of ads whose title starts with `q`, "
+        "for search box autocomplete.",
+        parameters=[
+            OpenApiParameter("q", str, required=True, description="Title prefix."),
+            OpenApiParameter(
+                "limit", int, description=f"Up to {SUGGEST_LIMIT} suggestions."
+            ),
+        ],
+        responses=AdSuggestionSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def suggest(self, request):
+        prefix = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        limit = max(1, min(limit, SUGGEST_LIMIT))
+
+        if not prefix:
+            return Response([])
+        return Response(title_index.search(prefix, limit))
+
+    @extend_schema(
+        summary="Ads cache statistics",
+        description="Returns hit and miss counters of the list and retrieve "
+        "response cache. Admin only.",
+        responses=AdCacheStatsSerializer,
+    )
+    @action(detail=False, methods=["get"], url_path="cache-stats")
+    def cache_stats(self, request):
+        return Response(ads_cache.stats())
+
+    @extend_schema(
+        summary="Export ads",
+        description="Streams every ad as NDJSON or CSV in constant memory. "
+        "`created_after` and `created_before` select a half-open range of "
+        "`created_at` for incremental exports. Admin only.",
+        parameters=[AdExportParamsSerializer],
+        responses={
+            (status.HTTP_200_OK, content_type): OpenApiTypes.STR
+            for _, content_type in EXPORT_FORMATS.values()
+        },
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        params = AdExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        export_format = params.validated_data["export_format"]
+
+        queryset = self.get_queryset()
+        if created_after := params.validated_data.get("created_after"):
+            queryset = queryset.filter(created_at__gte=created_after)
+        if created_before := params.validated_data.get("created_before"):
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        iter_rows, content_type = EXPORT_FORMATS[export_format]
+        filename = f"ads-{timezone.now():%Y%m%dT%H%M%S}.{export_format}"
+        lines = iter_rows(queryset)
+        if settings.ASYNC_VIEWS:
+            lines = aiter_lines(lines)
+        return StreamingHttpResponse(
+            lines,
+            content_type=f"{content_type}; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
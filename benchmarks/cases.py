@@ -0,0 +1,293 @@
+import io
+import itertools
+from dataclasses import dataclass
+from typing import Callable, NamedTuple
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from PIL import Image
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ads.models import Ad
+from benchmarks.seed import PASSWORD
+from reviews.models import Review
+from users.models import User
+
+
+class Dataset(NamedTuple):
+    """Objects of the seeded catalogue that the cases act on."""
+
+    user: User
+    admin: User
+    ad: Ad
+    review: Review
+
+
+class Call(NamedTuple):
+    url: str
+    data: dict | list | None = None
+    user: User | None = None
+
+
+@dataclass(frozen=True)
+class Case:
+    """
+    One timed request against a route of `config.urls`.
+
+    `prepare` runs untimed before every request and returns what to call, so
+    destructive cases can create the object they are about to delete.
+    """
+
+    route: str
+    method: str
+    prepare: Callable[[Dataset], Call]
+    status: int = status.HTTP_200_OK
+    label: str = ""
+
+    @property
+    def id(self) -> str:
+        return " ".join(filter(None, (self.route, self.method.upper(), self.label)))
+
+
+_sequence = itertools.count()
+
+
+def _new_ad(ds: Dataset) -> Ad:
+    return Ad.objects.create(
+        title="Benchmark", price=1, description="-", author=ds.user
+    )
+
+
+def _new_review(ds: Dataset) -> Review:
+    return Review.objects.create(text="Benchmark", author=ds.user, ad=ds.ad)
+
+
+def _new_user() -> User:
+    return User.objects.create(email=f"new{next(_sequence)}@benchmark.local")
+
+
+def _ad_url(ds: Dataset) -> str:
+    return reverse("ads:ad-detail", args=[ds.ad.id])
+
+
+def _reviews_url(ds: Dataset) -> str:
+    return reverse("ads:ads-review-list", args=[ds.ad.id])
+
+
+def _review_url(ds: Dataset, review: Review | None = None) -> str:
+    return reverse("ads:ads-review-detail", args=[ds.ad.id, (review or ds.review).id])
+
+
+def _avatar(ds: Dataset) -> str:
+    name = "avatars/benchmark.webp"
+    if not default_storage.exists(name):
+        image = io.BytesIO()
+        Image.new("RGB", (1024, 1024), "gray").save(image, "WEBP")
+        default_storage.save(name, ContentFile(image.getvalue()))
+    return name
+
+
+def _avatar_url(ds: Dataset) -> str:
+    # the warm-up request makes the variant, the timed requests read it
+    _avatar(ds)
+    return reverse(
+        "users:user-avatar",
+        kwargs={"name": "benchmark", "size": 128, "image_format": "webp"},
+    )
+
+
+def _reset_confirm(ds: Dataset) -> Call:
+    # the token is bound to the password hash, which every confirm changes
+    ds.user.refresh_from_db(fields=["password"])
+    return Call(
+        reverse("users:user-reset-password-confirm"),
+        {
+            "uid_b64": urlsafe_base64_encode(force_bytes(ds.user.pk)),
+            "token": default_token_generator.make_token(ds.user),
+            "new_password": PASSWORD,
+        },
+    )
+
+
+AD_DATA = {"title": "Benchmark ad", "price": 1000, "description": "Benchmark"}
+
+CASES = [
+    # docs
+    Case("schema", "get", lambda ds: Call(reverse("schema"))),
+    Case("swagger-ui", "get", lambda ds: Call(reverse("swagger-ui"))),
+    Case("redoc", "get", lambda ds: Call(reverse("redoc"))),
+    # media
+    Case("media", "get", lambda ds: Call(reverse("media", args=[_avatar(ds)]))),
+    # users
+    Case(
+        "users:token-obtain-pair",
+        "post",
+        lambda ds: Call(
+            reverse("users:token-obtain-pair"),
+            {"email": ds.user.email, "password": PASSWORD},
+        ),
+    ),
+    Case(
+        "users:token-refresh",
+        "post",
+        lambda ds: Call(
+            reverse("users:token-refresh"),
+            {"refresh": str(RefreshToken.for_user(ds.user))},
+        ),
+    ),
+    Case(
+        "users:token-revoke",
+        "post",
+        lambda ds: Call(
+            reverse("users:token-revoke"),
+            {"refresh": str(RefreshToken.for_user(ds.user))},
+            ds.user,
+        ),
+    ),
+    Case(
+        "users:user-register",
+        "post",
+        lambda ds: Call(
+            reverse("users:user-register"),
+            {"email": f"register{next(_sequence)}@benchmark.local", "password": "x"},
+        ),
+        status.HTTP_201_CREATED,
+    ),
+    Case(
+        "users:user-me", "get", lambda ds: Call(reverse("users:user-me"), user=ds.user)
+    ),
+    Case(
+        "users:user-me",
+        "patch",
+        lambda ds: Call(reverse("users:user-me"), {"first_name": "Bench"}, ds.user),
+    ),
+    Case("users:user-avatar", "get", lambda ds: Call(_avatar_url(ds))),
+    Case(
+        "users:user-me",
+        "delete",
+        lambda ds: Call(reverse("users:user-me"), user=_new_user()),
+        status.HTTP_204_NO_CONTENT,
+    ),
+    Case(
+        "users:user-change-password",
+        "put",
+        lambda ds: Call(
+            reverse("users:user-change-password"),
+            {"old_password": PASSWORD, "new_password": PASSWORD},
+            ds.user,
+        ),
+    ),
+    Case(
+        "users:user-reset-password",
+        "post",
+        lambda ds: Call(reverse("users:user-reset-password"), {"email": ds.user.email}),
+    ),
+    Case("users:user-reset-password-confirm", "post", _reset_confirm),
+    # ads
+    Case("ads:ad-list", "get", lambda ds: Call(reverse("ads:ad-list"))),
+    Case(
+        "ads:ad-list",
+        "get",
+        lambda ds: Call(reverse("ads:ad-list"), {"page": "last"}),
+        label="last page",
+    ),
+    Case(
+        "ads:ad-list",
+        "get",
+        lambda ds: Call(reverse("ads:ad-list"), {"pagination": "cursor"}),
+        label="cursor",
+    ),
+    Case(
+        "ads:ad-list",
+        "get",
+        lambda ds: Call(reverse("ads:ad-list"), {"search": "guitar lamp"}),
+        label="search",
+    ),
+    Case(
+        "ads:ad-list",
+        "post",
+        lambda ds: Call(reverse("ads:ad-list"), AD_DATA, ds.user),
+        status.HTTP_201_CREATED,
+    ),
+    Case("ads:ad-detail", "get", lambda ds: Call(_ad_url(ds), user=ds.user)),
+    Case("ads:ad-detail", "put", lambda ds: Call(_ad_url(ds), AD_DATA, ds.user)),
+    Case(
+        "ads:ad-detail",
+        "patch",
+        lambda ds: Call(_ad_url(ds), {"price": 2000}, ds.user),
+    ),
+    Case(
+        "ads:ad-detail",
+        "delete",
+        lambda ds: Call(reverse("ads:ad-detail", args=[_new_ad(ds).id]), user=ds.user),
+        status.HTTP_204_NO_CONTENT,
+    ),
+    Case(
+        "ads:ad-bulk-create",
+        "post",
+        lambda ds: Call(reverse("ads:ad-bulk-create"), [AD_DATA] * 100, ds.user),
+        status.HTTP_201_CREATED,
+        label="100 items",
+    ),
+    Case(
+        "ads:ad-bulk-create",
+        "patch",
+        lambda ds: Call(
+            reverse("ads:ad-bulk-create"),
+            [{"id": ds.ad.id, "price": 2000}],
+            ds.user,
+        ),
+    ),
+    Case(
+        "ads:ad-export",
+        "get",
+        lambda ds: Call(reverse("ads:ad-export"), user=ds.admin),
+    ),
+    Case(
+        "ads:ad-suggest",
+        "get",
+        lambda ds: Call(reverse("ads:ad-suggest"), {"q": "gui"}),
+    ),
+    Case(
+        "ads:ad-cache-stats",
+        "get",
+        lambda ds: Call(reverse("ads:ad-cache-stats"), user=ds.admin),
+    ),
+    # reviews
+    Case("ads:ads-review-list", "get", lambda ds: Call(_reviews_url(ds), user=ds.user)),
+    Case(
+        "ads:ads-review-list",
+        "post",
+        lambda ds: Call(_reviews_url(ds), {"text": "Benchmark"}, ds.user),
+        status.HTTP_201_CREATED,
+    ),
+    Case(
+        "ads:ads-review-detail", "get", lambda ds: Call(_review_url(ds), user=ds.user)
+    ),
+    Case(
+        "ads:ads-review-detail",
+        "patch",
+        lambda ds: Call(_review_url(ds), {"text": "Benchmark"}, ds.user),
+    ),
+    Case(
+        "ads:ads-review-detail",
+        "delete",
+        lambda ds: Call(_review_url(ds, _new_review(ds)), user=ds.user),
+        status.HTTP_204_NO_CONTENT,
+    ),
+]
+
+# Routes of `config.urls` that are deliberately not benchmarked.
+EXCLUDED_NAMESPACES = {
+    # Django admin, server-rendered and not part of the API
+    "admin",
+}
+EXCLUDED_ROUTES = {
+    # shadowed by `ads:ad-list`, which is registered on the same empty prefix
+    "ads:api-root",
+}
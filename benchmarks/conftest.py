@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.test import override_settings
+
+from ads.models import Ad
+from benchmarks.cases import Dataset
+from benchmarks.seed import PASSWORD, seed
+from reviews.models import Review
+from users.models import User
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def media_root(tmp_path_factory):
+    """Keeps the files written by the benchmarks out of `MEDIA_ROOT`."""
+
+    with override_settings(MEDIA_ROOT=tmp_path_factory.mktemp("media")):
+        yield
+
+
+@pytest.fixture(scope="session")
+def dataset(request, django_db_setup, django_db_blocker) -> Dataset:
+    """Seeds the test database once per session, outside of test transactions."""
+
+    with django_db_blocker.unblock():
+        seed(request.config.getoption("--benchmark-scale"))
+
+        user = User.objects.create(
+            email="bench@benchmark.local", password=make_password(PASSWORD)
+        )
+        admin = User.objects.create(
+            email="admin@benchmark.local", role=User.UserRole.ADMIN
+        )
+        ad = Ad.objects.create(
+            title="Benchmark", price=1, description="Benchmark", author=user
+        )
+        review = Review.objects.create(text="Benchmark", author=user, ad=ad)
+        return Dataset(user=user, admin=admin, ad=ad, review=review)
+
+
+@pytest.fixture(scope="session")
+def baseline() -> dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+@pytest.fixture(scope="session")
+def results(request, baseline):
+    """Collects measurements, written over the baseline with --benchmark-update."""
+
+    measured = {}
+    yield measured
+
+    if request.config.getoption("--benchmark-update") and measured:
+        BASELINE_PATH.write_text(
+            json.dumps(baseline | measured, indent=2, sort_keys=True) + "\n"
+        )
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption("--benchmark"):
+        return
+
+    measurements = [
+        value
+        for report in terminalreporter.getreports("passed")
+        + terminalreporter.getreports("failed")
+        for name, value in report.user_properties
+        if name == "benchmark"
+    ]
+    if not measurements:
+        return
+
+    terminalreporter.section("endpoint benchmarks")
+    terminalreporter.write_line(
+        f"{'case':<52} {'queries':>7} {'p50 ms':>9} {'p99 ms':>9}"
+    )
+    for case_id, result in measurements:
+        terminalreporter.write_line(
+            f"{case_id:<52} {result['queries']:>7} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+        )
@@ -0,0 +1,166 @@
+"""
+Load test of a running server, to compare the WSGI and the ASGI deployment.
+
+Keeps `--concurrency` keep-alive connections busy for `--duration` seconds and
+reports throughput, latency percentiles and, with `--server-pid`, the peak
+memory of the server process and its workers:
+
+    python -m benchmarks.load http://localhost:8000/api/v1/ads/ \\
+        --concurrency 200 --duration 30 --server-pid "$(pgrep -o gunicorn)"
+
+Only the standard library is used, so it runs anywhere the project does.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory of the process and all its descendants, in bytes."""
+
+    children: dict[int, list[int]] = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+
+    total, pending = 0, [pid]
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pending:
+        current = pending.pop()
+        try:
+            rss_pages = int(Path(f"/proc/{current}/statm").read_text().split()[1])
+        except OSError:
+            continue
+        total += rss_pages * page_size
+        pending += children.get(current, [])
+    return total
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """Reads one response, returns its status and whether the connection stays."""
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed by the server")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(url, headers: list[str], deadline: float, results: dict) -> None:
+    request = (
+        f"GET {url.path or '/'}{'?' + url.query if url.query else ''} HTTP/1.1\r\n"
+        f"Host: {url.netloc}\r\n"
+        + "".join(f"{header}\r\n" for header in headers)
+        + "\r\n"
+    ).encode("latin-1")
+
+    writer = None
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    url.hostname, url.port or 80
+                )
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            results["statuses"][type(exc).__name__] += 1
+            writer = None
+            await asyncio.sleep(0.01)
+            continue
+
+        results["latencies"].append((time.perf_counter() - started) * 1000)
+        results["statuses"][status] += 1
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def sample_memory(pid: int, deadline: float, samples: list[int]) -> None:
+    while time.monotonic() < deadline:
+        samples.append(process_tree_rss(pid))
+        await asyncio.sleep(0.5)
+
+
+async def run(args) -> dict:
+    url = urlsplit(args.url)
+    deadline = time.monotonic() + args.duration
+    results = {"latencies": [], "statuses": Counter(), "memory": []}
+
+    tasks = [
+        client(url, args.header, deadline, results) for _ in range(args.concurrency)
+    ]
+    if args.server_pid:
+        tasks.append(sample_memory(args.server_pid, deadline, results["memory"]))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("url", help="URL requested with GET, e.g. an ads list page.")
+    parser.add_argument(
+        "--concurrency", type=int, default=50, help="Open connections (default: 50)."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10, help="Seconds to run (default: 10)."
+    )
+    parser.add_argument(
+        "--header",
+        action="append",
+        default=[],
+        help="Extra request header, e.g. 'Authorization: Bearer ...'. Repeatable.",
+    )
+    parser.add_argument(
+        "--server-pid",
+        type=int,
+        help="Master process of the server, its memory is sampled with its workers.",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    latencies = results["latencies"]
+    if len(latencies) < 2:
+        raise SystemExit(f"Too few responses: {dict(results['statuses'])}")
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"requests     {len(latencies)} ({len(latencies) / args.duration:.1f}/s)")
+    print(f"statuses     {dict(results['statuses'])}")
+    print(
+        f"latency ms   p50 {percentiles[49]:.1f}  p90 {percentiles[89]:.1f}  "
+        f"p99 {percentiles[98]:.1f}  max {max(latencies):.1f}"
+    )
+    if memory := results["memory"]:
+        print(
+            f"server RSS   peak {max(memory) / 2**20:.0f} MiB  "
+            f"mean {statistics.fmean(memory) / 2**20:.0f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+
+from ads.models import Ad
+from reviews.models import Review
+from users.models import User
+
+USERS = 50_000
+ADS = 100_000
+REVIEWS = 1_000_000
+BATCH_SIZE = 5_000
+PASSWORD = "benchmark-password"
+
+WORDS = (
+    "bike phone sofa table lamp guitar camera laptop jacket boots watch "
+    "stroller desk chair bookshelf kettle drill tent skis puppy kitten"
+).split()
+
+
+def _batched_create(model, objects) -> None:
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def seed(scale: float) -> None:
+    """
+    Fills the database with a synthetic catalogue of `scale` times production size.
+
+    Every user shares one password hash, so seeding does not pay for hashing.
+    """
+
+    rng = random.Random(42)
+    password = make_password(PASSWORD)
+    users, ads, reviews = (max(1, int(n * scale)) for n in (USERS, ADS, REVIEWS))
+
+    _batched_create(
+        User,
+        (
+            User(email=f"user{i}@benchmark.local", password=password)
+            for i in range(users)
+        ),
+    )
+    user_ids = list(User.objects.values_list("id", flat=True))
+
+    _batched_create(
+        Ad,
+        (
+            Ad(
+                title=" ".join(rng.choices(WORDS, k=3)).capitalize(),
+                price=rng.randint(100, 100_000),
+                description=" ".join(rng.choices(WORDS, k=40)),
+                author_id=rng.choice(user_ids),
+            )
+            for _ in range(ads)
+        ),
+    )
+    ad_ids = list(Ad.objects.values_list("id", flat=True))
+
+    _batched_create(
+        Review,
+        (
+            Review(
+                text=" ".join(rng.choices(WORDS, k=20)),
+                author_id=rng.choice(user_ids),
+                ad_id=rng.choice(ad_ids),
+            )
+            for _ in range(reviews)
+        ),
+    )
+
+    call_command("rebuild_review_counters", batch_size=10_000, verbosity=0)
@@ -0,0 +1,172 @@
+import statistics
+import time
+from importlib.util import find_spec
+
+import pytest
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from benchmarks.cases import CASES, EXCLUDED_NAMESPACES, EXCLUDED_ROUTES, Case
+from users.serializers import TokenObtainPairSerializer
+
+
+def _route_names(resolver=None, namespace=None):
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            nested = ":".join(filter(None, (namespace, pattern.namespace)))
+            yield from _route_names(pattern, nested or None)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield ":".join(filter(None, (namespace, pattern.name)))
+
+
+def _request(client, method, call):
+    client.credentials()
+    if call.user is not None:
+        token = TokenObtainPairSerializer.get_token(call.user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    # every request is measured on a cold response cache
+    cache.clear()
+    if method == "get":
+        response = client.get(call.url, call.data)
+    else:
+        response = getattr(client, method)(call.url, call.data, format="json")
+    if response.streaming:
+        # streamed bodies are only produced while they are read
+        b"".join(response.streaming_content)
+    return response
+
+
+def test_every_route_has_a_case():
+    benchmarked = {case.route for case in CASES}
+    missing = {
+        name
+        for name in _route_names()
+        if name.split(":")[0] not in EXCLUDED_NAMESPACES
+        and name not in EXCLUDED_ROUTES
+        and name not in benchmarked
+    }
+
+    assert not missing, f"Routes without a benchmark case: {sorted(missing)}"
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.id)
+def test_endpoint(case: Case, request, api_client, dataset, baseline, results):
+    options = request.config.getoption
+    iterations = options("--benchmark-iterations")
+
+    # warm-up, fills the per-process caches a long-running server has warm
+    _request(api_client, case.method, case.prepare(dataset))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = _request(api_client, case.method, case.prepare(dataset))
+    assert response.status_code == case.status, response.content
+    # read before the next request, which resets the connection's query log
+    query_count = len(queries)
+
+    latencies = []
+    for _ in range(iterations):
+        call = case.prepare(dataset)
+        started = time.perf_counter()
+        _request(api_client, case.method, call)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    result = {
+        "queries": query_count,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentiles[98], 3),
+    }
+    results[case.id] = result
+    request.node.user_properties.append(("benchmark", (case.id, result)))
+
+    expected = baseline.get(case.id)
+    if expected is None or options("--benchmark-update"):
+        return
+
+    threshold = options("--benchmark-threshold")
+    slack_ms = options("--benchmark-slack-ms")
+    regressions = []
+    if result["queries"] > expected["queries"]:
+        regressions.append(f"queries {expected['queries']} -> {result['queries']}")
+    for key in ("p50_ms", "p99_ms"):
+        if result[key] > expected[key] * (1 + threshold) + slack_ms:
+            regressions.append(f"{key} {expected[key]} -> {result[key]}")
+
+    assert not regressions, f"{case.id} regressed: {', '.join(regressions)}"
+
+
+# settings of the default database, over the configured ones
+CONNECTION_MODES = {
+    "new connection": {"CONN_MAX_AGE": 0},
+    "persistent": {"CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": True},
+    "pool": {"CONN_MAX_AGE": 0, "OPTIONS": {"pool": {"min_size": 1, "max_size": 1}}},
+}
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_connection_reuse(request, api_client, dataset):
+    """
+    Times the ads list with a new, a persistent and a pooled connection.
+
+    The test client keeps its connection, so old connections are closed before
+    and after every request here, like the request handler of Django does. The
+    requests run on a connection of their own, outside the test transaction.
+    """
+
+    if connection.vendor != "postgresql":
+        pytest.skip("connection setup is measured on PostgreSQL")
+    iterations = request.config.getoption("--benchmark-iterations")
+    (case,) = (case for case in CASES if case.id == "ads:ad-list GET")
+    test_connection = connections[DEFAULT_DB_ALIAS]
+
+    p50 = {}
+    for mode, overrides in CONNECTION_MODES.items():
+        options = overrides.get("OPTIONS", {})
+        if "pool" in options and find_spec("psycopg_pool") is None:
+            continue
+        measured = connections.create_connection(DEFAULT_DB_ALIAS)
+        configured = measured.settings_dict
+        measured.settings_dict = configured | overrides
+        measured.settings_dict["OPTIONS"] = {
+            key: value for key, value in configured["OPTIONS"].items() if key != "pool"
+        } | options
+        connections[DEFAULT_DB_ALIAS] = measured
+
+        latencies = []
+        try:
+            # warm-up, opens the pool or the persistent connection
+            with CaptureQueriesContext(measured) as queries:
+                _request(api_client, case.method, case.prepare(dataset))
+            query_count = len(queries)
+
+            for _ in range(iterations):
+                call = case.prepare(dataset)
+                started = time.perf_counter()
+                close_old_connections()
+                _request(api_client, case.method, call)
+                close_old_connections()
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            measured.close()
+            measured.close_pool()
+            connections[DEFAULT_DB_ALIAS] = test_connection
+
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        result = {
+            "queries": query_count,
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p99_ms": round(percentiles[98], 3),
+        }
+        p50[mode] = result["p50_ms"]
+        request.node.user_properties.append(
+            ("benchmark", (f"{case.id} {mode}", result))
+        )
+
+    reused = p50.keys() - {"new connection"}
+    assert all(p50[mode] < p50["new connection"] for mode in reused), p50
@@ -0,0 +1,53 @@
+import mimetypes
+import posixpath
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_safe
+
+# uploads are stored under random names, a new file gets a new name
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# directories of the media storage anyone may read, other files are only sent
+# by views that check the permissions of the request first
+PUBLIC_PREFIXES = ("avatars/",)
+
+
+def media_response(name: str, content_type: str | None = None) -> HttpResponse:
+    """
+    Returns the file `name` of the media storage.
+
+    With `MEDIA_ACCEL_REDIRECT` set, the response has no body and an
+    `X-Accel-Redirect` to that internal location of nginx, which sends the file
+    with sendfile instead of a worker reading it.
+    """
+
+    content_type = content_type or mimetypes.guess_type(name)[0]
+    if prefix := settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(f"{prefix.rstrip('/')}/{name}")
+    else:
+        response = FileResponse(default_storage.open(name), content_type=content_type)
+    response["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Sends a file of `PUBLIC_PREFIXES` to anyone, or answers 404."""
+
+    # `..` is resolved first, so it cannot lead out of a public directory
+    name = posixpath.normpath(path)
+    if not name.startswith(PUBLIC_PREFIXES):
+        raise Http404
+    # nginx sends files from `MEDIA_ROOT`, so the storage is on the local disk
+    try:
+        is_file = Path(default_storage.path(name)).is_file()
+    except SuspiciousFileOperation:
+        is_file = False
+    if not is_file:
+        raise Http404
+    return media_response(name)
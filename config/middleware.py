@@ -0,0 +1,87 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+from config.routers import RoutingState, replica_set, routing_state
+from users.authentication import JWTClaimsAuthentication
+
+PIN_KEY = "db:pinned:{pk}"
+
+
+def _user_id(request) -> int | None:
+    # the DRF user once a view ran, a session user of the admin before
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+
+    # kept on the request, the view does not authenticate it again
+    try:
+        authenticated = JWTClaimsAuthentication().authenticate(request)
+    except APIException:
+        return None
+    return authenticated[0].pk if authenticated else None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Picks the replica that `config.routers.ReplicaRouter` reads from in safe
+    requests.
+
+    A user who wrote to the primary is pinned to it for `DB_REPLICA_PIN_TTL`
+    seconds through the default cache, which reaches every process only when
+    it is shared (see `users.checks`), so they read their own writes even from
+    a replica that lags behind.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DB_REPLICAS:
+            return self.get_response(request)
+
+        state = RoutingState(replica=self.get_replica(request))
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        if state.wrote:
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DB_REPLICAS:
+            return await self.get_response(request)
+
+        state = RoutingState(replica=await sync_to_async(self.get_replica)(request))
+        token = routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        if state.wrote:
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def get_replica(self, request) -> str | None:
+        if request.method not in SAFE_METHODS:
+            return None
+        user_id = _user_id(request)
+        if user_id is not None and cache.get(PIN_KEY.format(pk=user_id)):
+            return None
+        return replica_set.get_replica()
+
+    def pin(self, request) -> None:
+        user_id = _user_id(request)
+        if user_id is not None:
+            cache.set(PIN_KEY.format(pk=user_id), True, settings.DB_REPLICA_PIN_TTL)
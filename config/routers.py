@@ -0,0 +1,151 @@
+import math
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# apps whose rows must be read right after they are written, like a session
+# created by the login that the next request reads
+PRIMARY_APPS = {"sessions"}
+
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+@dataclass
+class RoutingState:
+    """How the queries of the current request are routed."""
+
+    # replica that reads go to, `None` reads from the primary
+    replica: str | None = None
+    # something was written to the primary, later reads stay there
+    wrote: bool = False
+
+
+routing_state: ContextVar[RoutingState | None] = ContextVar(
+    "routing_state", default=None
+)
+
+
+def reads_from_replica() -> bool:
+    """Whether the reads of the current request go to a replica."""
+
+    state = routing_state.get()
+    return state is not None and state.replica is not None and not state.wrote
+
+
+class ReplicaSet:
+    """
+    Picks a replica of `DB_REPLICAS` for a request.
+
+    Replicas are picked by smooth weighted round-robin, so a replica of weight 2
+    gets every other request of a pair of replicas weighted 2 and 1, never two
+    in a row. A replica whose replication lag was above `DB_REPLICA_MAX_LAG`
+    seconds or that could not be reached when last checked, at most
+    `DB_REPLICA_LAG_CHECK_INTERVAL` seconds ago, is skipped until the next
+    check. Queries the lag, so it must not be called from async code.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # alias -> current weight of the round-robin
+        self._current: dict[str, int] = {}
+        # alias -> (checked at, lag in seconds)
+        self._lag: dict[str, tuple[float, float]] = {}
+
+    def get_replica(self) -> str | None:
+        replicas = {
+            alias: weight
+            for alias, weight in settings.DB_REPLICAS.items()
+            if weight > 0 and self.get_lag(alias) <= settings.DB_REPLICA_MAX_LAG
+        }
+        if not replicas:
+            return None
+
+        with self._lock:
+            for alias, weight in replicas.items():
+                self._current[alias] = self._current.get(alias, 0) + weight
+            chosen = max(replicas, key=self._current.__getitem__)
+            self._current[chosen] -= sum(replicas.values())
+        return chosen
+
+    def get_lag(self, alias: str) -> float:
+        """Replication lag of the replica in seconds, infinite when unreachable."""
+
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lag.get(alias, (-math.inf, math.inf))
+            if now - checked_at < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+                return lag
+            # other threads keep the previous value until this check is done
+            self._lag[alias] = (now, lag)
+
+        lag = self.measure_lag(alias)
+        with self._lock:
+            self._lag[alias] = (now, lag)
+        return lag
+
+    def measure_lag(self, alias: str) -> float:
+        connection = connections[alias]
+        query = LAG_QUERIES.get(connection.vendor)
+        try:
+            with connection.cursor() as cursor:
+                if query is None:
+                    # no way to tell, a reachable replica counts as current
+                    cursor.execute("SELECT 1")
+                    return 0.0
+                cursor.execute(query)
+                return float(cursor.fetchone()[0] or 0)
+        except DatabaseError:
+            connection.close()
+            return math.inf
+
+
+replica_set = ReplicaSet()
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica picked for the request, if any.
+
+    The replica is picked by `config.middleware.ReplicaRoutingMiddleware` for
+    safe requests of users not pinned to the primary. Reads go to the primary
+    outside of requests and once the request wrote something.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if (
+            state is None
+            or state.wrote
+            or state.replica is None
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get the schema through replication
+        if db in settings.DB_REPLICAS:
+            return False
+        return None
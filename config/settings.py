@@ -1,7 +1,8 @@
+import copy
 from datetime import timedelta
 from pathlib import Path
 
-from decouple import Csv, config
+from decouple import Choices, Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "corsheaders",
     "drf_spectacular",
     "users",
@@ -36,6 +38,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "config.middleware.ReplicaRoutingMiddleware",
+    "users.middleware.HashingUnavailableMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -60,6 +64,11 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 
+# serve the list and retrieve actions of ads and reviews with async views, for
+# ASGI servers only, see `ads.mixins.AsyncViewSetMixin`
+ASYNC_VIEWS = config("ASYNC_VIEWS", cast=bool, default=False)
+
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -68,9 +77,53 @@ DATABASES = {
         "PASSWORD": config("DB_PASS"),
         "HOST": config("DB_HOST"),
         "PORT": config("DB_PORT"),
+        # connections are kept between requests and checked before reuse, except
+        # under ASGI, where each request may run in another thread
+        "CONN_MAX_AGE": config(
+            "DB_CONN_MAX_AGE", cast=int, default=0 if ASYNC_VIEWS else 60
+        ),
+        "CONN_HEALTH_CHECKS": config("DB_CONN_HEALTH_CHECKS", cast=bool, default=True),
+        # PgBouncer in transaction mode cannot keep a cursor between transactions
+        "DISABLE_SERVER_SIDE_CURSORS": config("DB_PGBOUNCER", cast=bool, default=False),
+        "OPTIONS": {},
     }
 }
 
+# a psycopg pool per process instead of one persistent connection per thread,
+# needs the `psycopg[pool]` package
+if config("DB_POOL", cast=bool, default=False):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": config("DB_POOL_MIN_SIZE", cast=int, default=2),
+        "max_size": config("DB_POOL_MAX_SIZE", cast=int, default=10),
+        "timeout": config("DB_POOL_TIMEOUT", cast=float, default=10),
+    }
+
+# read replicas of the primary as `host[:port]`, weighted for the round-robin,
+# see `config.routers.ReplicaRouter`
+DB_REPLICA_HOSTS = config("DB_REPLICA_HOSTS", cast=Csv(), default="")
+DB_REPLICA_WEIGHTS = config("DB_REPLICA_WEIGHTS", cast=Csv(int), default="")
+DB_REPLICAS = {}
+for number, address in enumerate(DB_REPLICA_HOSTS, start=1):
+    host, _, port = address.partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = copy.deepcopy(DATABASES["default"]) | {
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DB_REPLICAS[alias] = (
+        DB_REPLICA_WEIGHTS[number - 1] if number <= len(DB_REPLICA_WEIGHTS) else 1
+    )
+DB_REPLICA_MAX_LAG = config("DB_REPLICA_MAX_LAG", cast=float, default=5)
+DB_REPLICA_LAG_CHECK_INTERVAL = config(
+    "DB_REPLICA_LAG_CHECK_INTERVAL", cast=float, default=2
+)
+# longer than the lag a replica may have, plus the interval it is checked in
+DB_REPLICA_PIN_TTL = config("DB_REPLICA_PIN_TTL", cast=int, default=10)
+
+DATABASE_ROUTERS = ["config.routers.ReplicaRouter"]
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -89,6 +142,55 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 AUTH_USER_MODEL = "users.User"
 
+# new passwords are hashed with the chosen profile, hashes of other profiles or
+# cost parameters are upgraded on login, see `users.hashers` and
+# `manage.py calibrate_password_hasher`
+PASSWORD_HASHER_PROFILES = {
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "argon2": "users.hashers.Argon2PasswordHasher",
+}
+USERS_PASSWORD_HASHER = config(
+    "USERS_PASSWORD_HASHER",
+    cast=Choices(list(PASSWORD_HASHER_PROFILES)),
+    default="scrypt",
+)
+USERS_SCRYPT_WORK_FACTOR = config("USERS_SCRYPT_WORK_FACTOR", cast=int, default=2**15)
+USERS_SCRYPT_BLOCK_SIZE = config("USERS_SCRYPT_BLOCK_SIZE", cast=int, default=8)
+USERS_SCRYPT_PARALLELISM = config("USERS_SCRYPT_PARALLELISM", cast=int, default=1)
+USERS_ARGON2_TIME_COST = config("USERS_ARGON2_TIME_COST", cast=int, default=3)
+# KiB
+USERS_ARGON2_MEMORY_COST = config("USERS_ARGON2_MEMORY_COST", cast=int, default=65536)
+USERS_ARGON2_PARALLELISM = config("USERS_ARGON2_PARALLELISM", cast=int, default=1)
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[USERS_PASSWORD_HASHER],
+    *(
+        path
+        for profile, path in PASSWORD_HASHER_PROFILES.items()
+        if profile != USERS_PASSWORD_HASHER
+    ),
+    "users.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+# request threads of a gunicorn worker, as in `gunicorn.conf.py`
+GUNICORN_THREADS = config(
+    "GUNICORN_THREADS",
+    cast=int,
+    default=4 if config("GUNICORN_WORKER_CLASS", default="gthread") == "gthread" else 1,
+)
+# passwords hashed at once per process, more wait in a queue of bounded size and
+# the rest is rejected with 503 and `Retry-After` seconds, see `users.hashers`;
+# every hashed or queued password holds a request thread, so together they
+# leave at least one of `GUNICORN_THREADS` free, see `users.checks`
+USERS_HASHING_WORKERS = config(
+    "USERS_HASHING_WORKERS", cast=int, default=max(1, GUNICORN_THREADS // 2)
+)
+USERS_HASHING_QUEUE_SIZE = config(
+    "USERS_HASHING_QUEUE_SIZE",
+    cast=int,
+    default=max(0, GUNICORN_THREADS - 1 - USERS_HASHING_WORKERS),
+)
+USERS_HASHING_RETRY_AFTER = config("USERS_HASHING_RETRY_AFTER", cast=int, default=1)
+
 
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -102,17 +204,55 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # hashed and compressed by `collectstatic` when the image is built
+    "staticfiles": {
+        "BACKEND": "config.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# internal location of nginx that media files are sent from, see `config.media`,
+# Django sends them itself when empty
+MEDIA_ACCEL_REDIRECT = config("MEDIA_ACCEL_REDIRECT", default="")
+
+# avatars are stored downsized and served in variants made on first access,
+# see `users.avatars`
+USERS_AVATAR_MAX_UPLOAD_SIZE = config(
+    "USERS_AVATAR_MAX_UPLOAD_SIZE", cast=int, default=10 * 1024 * 1024
+)
+USERS_AVATAR_MAX_SIZE = config("USERS_AVATAR_MAX_SIZE", cast=int, default=1024)
+USERS_AVATAR_MAX_PIXELS = config(
+    "USERS_AVATAR_MAX_PIXELS", cast=int, default=50_000_000
+)
+USERS_AVATAR_SIZES = config("USERS_AVATAR_SIZES", cast=Csv(int), default="64,128,256")
+USERS_AVATAR_FORMATS = config("USERS_AVATAR_FORMATS", cast=Csv(), default="webp,avif")
+USERS_AVATAR_QUALITY = config("USERS_AVATAR_QUALITY", cast=int, default=80)
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# shared by every process, revoked tokens, cached ads with their generation
+# counters and replica pins live there, see `users.checks`
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="redis://redis:6379"),
+    }
+}
+
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.JWTClaimsAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
@@ -121,6 +261,9 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.TokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "users.authentication.ClaimsUser",
 }
 
 
@@ -133,9 +276,72 @@ SPECTACULAR_SETTINGS = {
 }
 
 
-EMAIL_BACKEND = config(
-    "EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+# Cursor feed (`?pagination=cursor`) reports the planner's row estimate instead of
+# running `COUNT(*)` when enabled. Estimates below the threshold are counted exactly.
+ADS_FEED_APPROXIMATE_COUNT = config(
+    "ADS_FEED_APPROXIMATE_COUNT", cast=bool, default=False
+)
+ADS_APPROXIMATE_COUNT_THRESHOLD = config(
+    "ADS_APPROXIMATE_COUNT_THRESHOLD", cast=int, default=10_000
+)
+
+# Minimum trigram similarity for `?search_mode=fuzzy` (PostgreSQL `pg_trgm`), the
+# trigram index only serves values from 0.3, the default of `pg_trgm`, up.
+ADS_SEARCH_SIMILARITY_THRESHOLD = config(
+    "ADS_SEARCH_SIMILARITY_THRESHOLD", cast=float, default=0.3
+)
+
+# In-process title index behind `GET /api/v1/ads/suggest/`: the number of newest
+# ads it holds (its memory cap) and how often it is rebuilt from the database.
+ADS_SUGGEST_MAX_ENTRIES = config("ADS_SUGGEST_MAX_ENTRIES", cast=int, default=100_000)
+ADS_SUGGEST_TTL = config("ADS_SUGGEST_TTL", cast=int, default=300)
+
+# Lifetime of cached ads list pages and retrieve payloads, in seconds. They are
+# kept in the default cache, which must be shared by every process.
+ADS_CACHE_TTL = config("ADS_CACHE_TTL", cast=int, default=60)
+
+# Bulk create/update (`/ads/bulk/`): items per request and rows per INSERT/UPDATE.
+ADS_BULK_MAX_ITEMS = config("ADS_BULK_MAX_ITEMS", cast=int, default=10_000)
+ADS_BULK_BATCH_SIZE = config("ADS_BULK_BATCH_SIZE", cast=int, default=1_000)
+
+# Rows fetched per round trip by the streaming export (`/ads/export/`).
+ADS_EXPORT_CHUNK_SIZE = config("ADS_EXPORT_CHUNK_SIZE", cast=int, default=2_000)
+
+# Write requests authenticate against a per-process LRU of users instead of
+# querying the user on every request: seconds an entry lives and entries kept.
+USERS_AUTH_CACHE_TTL = config("USERS_AUTH_CACHE_TTL", cast=int, default=30)
+USERS_AUTH_CACHE_MAX_ENTRIES = config(
+    "USERS_AUTH_CACHE_MAX_ENTRIES", cast=int, default=10_000
+)
+
+# Revoked tokens live in the default cache, every process checks them through a
+# local Bloom filter: seconds between syncs, filter capacity and error rate.
+USERS_REVOCATION_SYNC_INTERVAL = config(
+    "USERS_REVOCATION_SYNC_INTERVAL", cast=float, default=5
+)
+USERS_REVOCATION_BLOOM_CAPACITY = config(
+    "USERS_REVOCATION_BLOOM_CAPACITY", cast=int, default=100_000
+)
+USERS_REVOCATION_BLOOM_ERROR_RATE = config(
+    "USERS_REVOCATION_BLOOM_ERROR_RATE", cast=float, default=0.001
+)
+
+
+# emails are queued in the outbox and delivered by `manage.py run_mail_worker`
+# through `USERS_MAIL_DELIVERY_BACKEND`, see `users.mail`
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="users.mail.OutboxBackend")
+USERS_MAIL_DELIVERY_BACKEND = config(
+    "USERS_MAIL_DELIVERY_BACKEND",
+    default="django.core.mail.backends.smtp.EmailBackend",
+)
+USERS_MAIL_MAX_ATTEMPTS = config("USERS_MAIL_MAX_ATTEMPTS", cast=int, default=5)
+# seconds before the first retry, doubled after every failed attempt
+USERS_MAIL_RETRY_DELAY = config("USERS_MAIL_RETRY_DELAY", cast=int, default=30)
+USERS_MAIL_RETRY_MAX_DELAY = config(
+    "USERS_MAIL_RETRY_MAX_DELAY", cast=int, default=3600
 )
+# days failed emails, blanked to their subject and recipients, are kept for
+USERS_MAIL_FAILED_RETENTION = config("USERS_MAIL_FAILED_RETENTION", cast=int, default=7)
 EMAIL_HOST = config("EMAIL_HOST")
 EMAIL_PORT = config("EMAIL_PORT", cast=int)
 EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool, default=True)
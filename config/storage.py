@@ -0,0 +1,55 @@
+import gzip
+from pathlib import PurePosixPath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# formats worth compressing, images and fonts are compressed already
+COMPRESSED_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".html"}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Stores static files under names hashed from their content, each next to a
+    `.gz` and, with the `brotli` package installed, a `.br` copy.
+
+    The copies are made once by `collectstatic`, so nginx sends them as they are
+    instead of compressing every response.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if not dry_run:
+            for hashed_name in hashed_names:
+                self.compress(hashed_name)
+
+    def compress(self, name: str) -> None:
+        if PurePosixPath(name).suffix not in COMPRESSED_EXTENSIONS:
+            return
+
+        with self.open(name) as file:
+            content = file.read()
+        # no timestamp, so the same file compresses to the same bytes
+        compressed = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed[".br"] = brotli.compress(content)
+
+        for extension, data in compressed.items():
+            # not worth a copy, nginx sends the file itself
+            if len(data) >= len(content):
+                continue
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            self._save(name + extension, ContentFile(data))
@@ -0,0 +1,140 @@
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import reverse
+from rest_framework import status
+
+ACCEL_PREFIX = "/protected-media/"
+
+# fixtures
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def media_file(media_root):
+    return default_storage.save("avatars/avatar.webp", ContentFile(b"RIFF avatar"))
+
+
+@contextmanager
+def running(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def nginx(media_root, settings):
+    """
+    Stub of the nginx of `nginx.conf` in front of Django.
+
+    Requests are proxied to Django, an `X-Accel-Redirect` to the internal
+    location is answered with the file of `MEDIA_ROOT`, keeping the
+    `Content-Type` and `Cache-Control` of Django as nginx does.
+    """
+
+    settings.MEDIA_ACCEL_REDIRECT = ACCEL_PREFIX
+    settings.ALLOWED_HOSTS = ["127.0.0.1"]
+    upstream = []
+    django = make_server("127.0.0.1", 0, WSGIHandler(), handler_class=QuietHandler)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                response = urllib.request.urlopen(django_url + self.path)
+            except urllib.error.HTTPError as exc:
+                response = exc
+            upstream.append(response)
+            body = response.read()
+
+            if redirect := response.headers.get("X-Accel-Redirect"):
+                assert redirect.startswith(ACCEL_PREFIX)
+                name = unquote(redirect.removeprefix(ACCEL_PREFIX))
+                body = (media_root / name).read_bytes()
+
+            self.send_response(response.status)
+            for header in ("Content-Type", "Cache-Control"):
+                if header in response.headers:
+                    self.send_header(header, response.headers[header])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with running(django) as django_url:
+        with running(ThreadingHTTPServer(("127.0.0.1", 0), Handler)) as url:
+            yield url, upstream
+
+
+def get(url):
+    try:
+        return urllib.request.urlopen(url)
+    except urllib.error.HTTPError as exc:
+        return exc
+
+
+# media
+
+
+def test_media_sent_by_nginx(nginx, media_file):
+    url, upstream = nginx
+
+    response = get(url + reverse("media", args=[media_file]))
+
+    assert response.status == status.HTTP_200_OK
+    assert response.read() == b"RIFF avatar"
+    assert response.headers["Content-Type"] == "image/webp"
+    assert "immutable" in response.headers["Cache-Control"]
+    # Django only checked the file, nginx sent it
+    assert upstream[0].headers["X-Accel-Redirect"] == ACCEL_PREFIX + media_file
+    assert upstream[0].headers["Content-Length"] == "0"
+
+
+@pytest.mark.parametrize("path", ["avatars/missing.webp", "avatars", "../settings.py"])
+def test_media_not_found(nginx, media_file, path):
+    url, upstream = nginx
+
+    response = get(url + reverse("media", args=[path]))
+
+    assert response.status == status.HTTP_404_NOT_FOUND
+    assert "X-Accel-Redirect" not in upstream[0].headers
+
+
+@pytest.mark.parametrize(
+    "path", ["private/report.csv", "avatars/../private/report.csv", "avatars2/a.webp"]
+)
+def test_media_outside_public_prefixes_not_found(nginx, media_file, path):
+    default_storage.save("private/report.csv", ContentFile(b"id,title"))
+    default_storage.save("avatars2/a.webp", ContentFile(b"RIFF avatar"))
+    url, upstream = nginx
+
+    response = get(url + reverse("media", args=[path]))
+
+    assert response.status == status.HTTP_404_NOT_FOUND
+    assert "X-Accel-Redirect" not in upstream[0].headers
+
+
+def test_media_sent_by_django(client, media_file):
+    response = client.get(reverse("media", args=[media_file]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert b"".join(response.streaming_content) == b"RIFF avatar"
+    assert "immutable" in response["Cache-Control"]
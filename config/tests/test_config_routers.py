@@ -0,0 +1,175 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ads import cache as ads_cache
+from ads.models import Ad
+from config.routers import ReplicaSet
+from reviews.models import Review
+from users.authentication import JWTClaimsAuthentication
+from users.models import User
+from users.serializers import TokenObtainPairSerializer
+
+replica_db = pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, "replica"])
+
+# fixtures
+
+
+@pytest.fixture
+def replica(settings):
+    """The SQLite `replica` database as the only replica of `default`."""
+
+    settings.DB_REPLICAS = {"replica": 1}
+    settings.DB_REPLICA_LAG_CHECK_INTERVAL = 0
+    return "replica"
+
+
+def authenticate(api_client, user):
+    token = TokenObtainPairSerializer.get_token(user).access_token
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+def add_replica_review(replica, ad) -> None:
+    """Adds a review of the ad, the ad and its author that only the replica has."""
+
+    author = User.objects.using(replica).create(email="replica@replica.com")
+    replica_ad = Ad.objects.using(replica).create(
+        pk=ad.pk, title="Replica", price=1, description="Replica", author=author
+    )
+    Review.objects.using(replica).create(ad=replica_ad, author=author, text="Replica")
+
+
+# routing
+
+
+@replica_db
+def test_safe_request_reads_from_replica(api_client, user, ad, replica):
+    add_replica_review(replica, ad)
+    authenticate(api_client, user)
+
+    response = api_client.get(reverse("ads:ads-review-list", args=[ad.pk]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["text"] for item in response.data] == ["Replica"]
+
+
+@replica_db
+def test_reads_outside_requests_use_primary(replica):
+    assert router.db_for_read(Ad) == DEFAULT_DB_ALIAS
+    assert router.db_for_write(Ad) == DEFAULT_DB_ALIAS
+
+
+@replica_db
+def test_writer_reads_own_writes(api_client, user, random_user, ad, replica):
+    authenticate(api_client, user)
+    response = api_client.post(
+        reverse("ads:ads-review-list", args=[ad.pk]), {"text": "Review"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    url = reverse("ads:ads-review-detail", args=[ad.pk, response.data["id"]])
+
+    # other users read the replica, which has not caught up yet
+    other_client = APIClient()
+    authenticate(other_client, random_user)
+    assert other_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+    assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    # once the pin expires
+    cache.clear()
+    assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+@replica_db
+def test_safe_request_authenticates_once(api_client, user, ad, replica, monkeypatch):
+    calls = []
+    get_validated_token = JWTClaimsAuthentication.get_validated_token
+    monkeypatch.setattr(
+        JWTClaimsAuthentication,
+        "get_validated_token",
+        lambda self, raw: calls.append(raw) or get_validated_token(self, raw),
+    )
+    add_replica_review(replica, ad)
+    authenticate(api_client, user)
+
+    response = api_client.get(reverse("ads:ads-review-list", args=[ad.pk]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(calls) == 1
+
+
+@replica_db
+def test_ads_cache_is_filled_from_replica(api_client, ad, replica):
+    add_replica_review(replica, ad)
+
+    for _ in range(2):
+        response = api_client.get(reverse("ads:ad-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["title"] for item in response.data["results"]] == ["Replica"]
+    assert ads_cache.stats()["list"] == {"hits": 1, "misses": 1}
+
+
+@replica_db
+def test_ads_cache_skips_replica_reads_after_invalidation(
+    api_client, user, ad, replica
+):
+    add_replica_review(replica, ad)
+    authenticate(api_client, user)
+    ads_cache.invalidate(ad.pk)
+
+    # the replica may not have the change yet
+    for _ in range(2):
+        response = api_client.get(reverse("ads:ad-list"))
+        assert [item["title"] for item in response.data["results"]] == ["Replica"]
+        response = api_client.get(reverse("ads:ad-detail", args=[ad.pk]))
+        assert response.data["title"] == "Replica"
+    assert ads_cache.stats() == {
+        "list": {"hits": 0, "misses": 2},
+        "retrieve": {"hits": 0, "misses": 2},
+    }
+
+
+# replicas
+
+
+@replica_db
+def test_replicas_are_weighted_round_robin(replica, settings):
+    # `default` stands in for a second replica
+    settings.DB_REPLICAS = {DEFAULT_DB_ALIAS: 2, replica: 1}
+    replicas = ReplicaSet()
+
+    chosen = [replicas.get_replica() for _ in range(6)]
+
+    assert chosen == [DEFAULT_DB_ALIAS, replica, DEFAULT_DB_ALIAS] * 2
+
+
+@replica_db
+def test_lagging_replica_gets_no_reads(replica, settings):
+    replicas = ReplicaSet()
+    assert replicas.get_replica() == replica
+
+    settings.DB_REPLICA_MAX_LAG = -1
+
+    assert replicas.get_replica() is None
+
+
+# async
+
+
+@replica_db
+def test_asgi_request_reads_from_replica(user, ad, replica):
+    add_replica_review(replica, ad)
+    token = TokenObtainPairSerializer.get_token(user).access_token
+
+    response = async_to_sync(AsyncClient().get)(
+        reverse("ads:ads-review-list", args=[ad.pk]),
+        headers={"authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["text"] for item in response.json()] == ["Replica"]
@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+
+SCRIPT = "document.title = 'Trust Ads';\n" * 100
+
+# fixtures
+
+
+@pytest.fixture
+def collectstatic(settings, tmp_path):
+    """Collects a script, a stylesheet and a tiny file into a temporary root."""
+
+    source = tmp_path / "static"
+    source.mkdir()
+    (source / "app.js").write_text(SCRIPT)
+    (source / "app.css").write_text("body { background: url('logo.svg'); }\n" * 20)
+    (source / "logo.svg").write_text("<svg/>")
+    settings.STATICFILES_DIRS = [source]
+    settings.STATIC_ROOT = tmp_path / "staticfiles"
+
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return settings.STATIC_ROOT
+
+
+# static files
+
+
+def test_static_files_hashed_and_gzipped(collectstatic):
+    name = staticfiles_storage.stored_name("app.js")
+    compressed = (collectstatic / f"{name}.gz").read_bytes()
+
+    assert name != "app.js"
+    assert gzip.decompress(compressed) == SCRIPT.encode()
+
+
+def test_static_references_hashed_before_compression(collectstatic):
+    css = staticfiles_storage.stored_name("app.css")
+    svg = staticfiles_storage.stored_name("logo.svg")
+
+    content = gzip.decompress((collectstatic / f"{css}.gz").read_bytes()).decode()
+
+    assert svg in content
+
+
+def test_static_files_not_worth_compressing(collectstatic):
+    name = staticfiles_storage.stored_name("logo.svg")
+
+    assert (collectstatic / name).exists()
+    assert not (collectstatic / f"{name}.gz").exists()
+
+
+def test_static_files_brotli(collectstatic):
+    brotli = pytest.importorskip("brotli")
+    name = staticfiles_storage.stored_name("app.js")
+    compressed = (collectstatic / f"{name}.br").read_bytes()
+
+    assert brotli.decompress(compressed) == SCRIPT.encode()
@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import (
@@ -8,6 +7,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from config import media
+
 urlpatterns = [
     # admin
     path("admin/", admin.site.urls),
@@ -18,7 +19,6 @@ urlpatterns = [
     # apps
     path("api/v1/users/", include("users.urls")),
     path("api/v1/ads/", include("ads.urls")),
+    # media
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", media.serve, name="media"),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, decument_root=settings.MEDIA_ROOT)
@@ -1,18 +1,159 @@
 import pytest
-from rest_framework.test import APIClient
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 
 from ads.models import Ad
 from reviews.models import Review
+from users.authentication import user_cache
 from users.models import User
+from users.revocation import revocation_list
 
 # general
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark", "endpoint benchmarks (see benchmarks/)")
+    group.addoption(
+        "--benchmark",
+        action="store_true",
+        help="Run the endpoint benchmarks, which are skipped by default.",
+    )
+    group.addoption(
+        "--benchmark-update",
+        action="store_true",
+        help="Write the measured numbers to benchmarks/baseline.json.",
+    )
+    group.addoption(
+        "--benchmark-scale",
+        type=float,
+        default=1.0,
+        help="Size of the seeded dataset relative to production (default: 1.0).",
+    )
+    group.addoption(
+        "--benchmark-iterations",
+        type=int,
+        default=20,
+        help="Timed requests per case (default: 20).",
+    )
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative latency regression (default: 0.25).",
+    )
+    group.addoption(
+        "--benchmark-slack-ms",
+        type=float,
+        default=2.0,
+        help="Allowed absolute latency regression in ms (default: 2.0).",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="endpoint benchmarks need --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings):
+    """Adds `replica`, a SQLite database standing in for a read replica."""
+
+    settings.DATABASES["replica"] = connections.configure_settings(
+        {
+            DEFAULT_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS],
+            "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+        }
+    )["replica"]
+
+
 @pytest.fixture
 def api_client() -> APIClient:
     return APIClient()
 
 
+@pytest.fixture
+def call_async_view(settings):
+    """Calls a viewset action through its view as served under ASGI."""
+
+    settings.ASYNC_VIEWS = True
+    factory = APIRequestFactory()
+
+    def _call_async_view(viewset, method, action, data=None, user=None, **kwargs):
+        view = viewset.as_view({method: action})
+        headers = kwargs.pop("headers", None)
+        if method == "get":
+            request = factory.get("/", data, headers=headers)
+        else:
+            request = getattr(factory, method)(
+                "/", data, format="json", headers=headers
+            )
+        if user is not None:
+            force_authenticate(request, user)
+
+        response = async_to_sync(view)(request, **kwargs)
+        # 304 responses come from Django and are not rendered
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    return _call_async_view
+
+
+@pytest.fixture(autouse=True, scope="session")
+def fast_password_hasher(request):
+    """Hashes new passwords with MD5, except when endpoints are benchmarked."""
+
+    if request.config.getoption("--benchmark"):
+        yield
+        return
+    hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    with override_settings(PASSWORD_HASHERS=hashers + settings.PASSWORD_HASHERS):
+        yield
+
+
+@pytest.fixture(autouse=True, scope="session")
+def local_cache():
+    """Keeps the cache in the test process, so no cache server is needed."""
+
+    caches = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    with override_settings(CACHES=caches):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    user_cache.clear()
+    revocation_list.clear()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """Stores uploaded files in a temporary directory."""
+
+    settings.MEDIA_ROOT = tmp_path / "media"
+    return settings.MEDIA_ROOT
+
+
+@pytest.fixture
+def assert_action_queries(api_client, django_assert_num_queries):
+    """Calls the API and asserts how many SQL queries the action ran."""
+
+    def _assert_action_queries(num, method, url, data=None):
+        with django_assert_num_queries(num):
+            return getattr(api_client, method)(url, data)
+
+    return _assert_action_queries
+
+
 # users
 
 
@@ -0,0 +1,90 @@
+"""
+Gunicorn settings, driven by `GUNICORN_*` environment variables (or `.env`).
+
+`GUNICORN_WORKER_CLASS` selects the worker model:
+
+- `gthread` (default): WSGI workers with `GUNICORN_THREADS` threads each.
+- `uvicorn`: ASGI workers serving `config.asgi:application` with async views,
+  needs the optional `asgi` dependency group, installed in the image.
+- `sync`: one request per WSGI worker at a time.
+"""
+
+import os
+
+import decouple
+
+WORKER_CLASSES = {
+    "gthread": "gthread",
+    "sync": "sync",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+# CPUs this process may run on, the CPU quota of a container is not included
+cores = len(os.sched_getaffinity(0))
+
+kind = decouple.config(
+    "GUNICORN_WORKER_CLASS",
+    cast=decouple.Choices(list(WORKER_CLASSES)),
+    default="gthread",
+)
+worker_class = WORKER_CLASSES[kind]
+if kind == "uvicorn":
+    wsgi_app = "config.asgi:application"
+    # read by `config.settings`, which the workers import after this file
+    os.environ.setdefault("ASYNC_VIEWS", "True")
+else:
+    wsgi_app = "config.wsgi:application"
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8000")
+# threads and the event loop cover waiting on I/O, processes cover the CPU
+workers = decouple.config(
+    "GUNICORN_WORKERS",
+    cast=int,
+    default=cores * 2 + 1 if kind == "sync" else cores + 1,
+)
+threads = decouple.config(
+    "GUNICORN_THREADS", cast=int, default=4 if kind == "gthread" else 1
+)
+
+# the app is imported once in the master and its memory shared copy-on-write
+preload_app = decouple.config("GUNICORN_PRELOAD", cast=bool, default=True)
+# workers are recycled after a jittered number of requests, so memory that
+# creeps up is returned and they do not all restart at once
+max_requests = decouple.config("GUNICORN_MAX_REQUESTS", cast=int, default=1000)
+max_requests_jitter = decouple.config(
+    "GUNICORN_MAX_REQUESTS_JITTER", cast=int, default=100
+)
+
+timeout = decouple.config("GUNICORN_TIMEOUT", cast=int, default=30)
+graceful_timeout = decouple.config("GUNICORN_GRACEFUL_TIMEOUT", cast=int, default=30)
+keepalive = decouple.config("GUNICORN_KEEPALIVE", cast=int, default=5)
+
+
+def close_connections() -> None:
+    """Closes database and cache connections opened by this process."""
+
+    from django.apps import apps
+
+    if not apps.ready:
+        return
+
+    from django.core.cache import caches
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        # the psycopg pool of `DB_POOL` holds connections of its own
+        if connection.vendor == "postgresql":
+            connection.close_pool()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+
+
+def pre_fork(server, worker):
+    # a socket opened while preloading would be inherited by every worker
+    close_connections()
+
+
+def post_fork(server, worker):
+    # workers open their own connections on first use
+    close_connections()
@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from ads import cache as ads_cache
+from ads.models import Ad
+
+from .models import Review
+
+
+def _reviews_of_outer_ad():
+    return Review.objects.filter(ad=OuterRef("pk")).order_by()
+
+
+def count_reviews():
+    """`Ad.reviews_count` recomputed from the reviews table."""
+
+    return Coalesce(
+        Subquery(
+            _reviews_of_outer_ad()
+            .values("ad")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def latest_review_at():
+    """`Ad.last_review_at` recomputed from the reviews table."""
+
+    return Subquery(
+        _reviews_of_outer_ad().order_by("-created_at").values("created_at")[:1]
+    )
+
+
+def _update_ads(ad_ids: list[int], **counters) -> None:
+    # `updated_at` moves too, the counters are part of the ad representation
+    Ad.objects.filter(pk__in=ad_ids).update(updated_at=Now(), **counters)
+    transaction.on_commit(lambda: ads_cache.invalidate(*ad_ids))
+
+
+def review_added(review: Review) -> None:
+    """Counts a new review in its ad, within the caller's transaction."""
+
+    # transactions may commit out of `created_at` order, the latest one stays
+    _update_ads(
+        [review.ad_id],
+        reviews_count=F("reviews_count") + 1,
+        last_review_at=Greatest(
+            Coalesce(F("last_review_at"), Value(review.created_at)),
+            Value(review.created_at),
+        ),
+    )
+
+
+def review_removed(review: Review) -> None:
+    """Discounts a deleted review from its ad, within the caller's transaction."""
+
+    _update_ads(
+        [review.ad_id],
+        reviews_count=Greatest(F("reviews_count") - 1, Value(0)),
+        last_review_at=latest_review_at(),
+    )
+
+
+def lock_ads(ad_ids: list[int]) -> None:
+    """
+    Locks the given ads in pk order until the caller's transaction ends.
+
+    Transactions that write reviews of several ads lock them before the first
+    insert, so two of them sharing an ad wait for each other instead of
+    deadlocking.
+    """
+
+    list(
+        Ad.objects.select_for_update()
+        .filter(pk__in=ad_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def rebuild(ad_ids: list[int]) -> None:
+    """
+    Recomputes the counters of the given ads from scratch, within the caller's
+    transaction.
+
+    The ads are locked first, so the recount waits for concurrent transactions
+    that add reviews to them and then sees their rows.
+    """
+
+    lock_ads(ad_ids)
+    _update_ads(
+        ad_ids, reviews_count=count_reviews(), last_review_at=latest_review_at()
+    )
@@ -0,0 +1,39 @@
+from ads.importing import Importer, Record, RowError
+from ads.models import Ad
+
+from . import counters
+from .models import Review
+from .serializers import ReviewImportSerializer
+
+
+class ReviewImporter(Importer):
+    model = Review
+    serializer_class = ReviewImportSerializer
+
+    def build(self, valid: list[Record], errors: list[RowError]) -> list:
+        ad_ids = set(
+            Ad.objects.filter(
+                pk__in={attrs["ad_id"] for _, attrs in valid}
+            ).values_list("pk", flat=True)
+        )
+
+        known = []
+        for number, attrs in valid:
+            if attrs["ad_id"] in ad_ids:
+                known.append((number, attrs))
+            else:
+                errors.append((number, {"ad": ["Ad does not exist."]}))
+        return super().build(known, errors)
+
+    def before_write(self, objects: list) -> None:
+        # the ads are locked before the inserts take `KEY SHARE` locks on them,
+        # which the `FOR UPDATE` of a concurrent batch sharing an ad waits for
+        counters.lock_ads(self.ad_ids(objects))
+
+    def after_write(self, objects: list) -> None:
+        # bulk writes skip `counters.review_added`
+        counters.rebuild(self.ad_ids(objects))
+
+    @staticmethod
+    def ad_ids(objects: list) -> list[int]:
+        return sorted({review.ad_id for review in objects})
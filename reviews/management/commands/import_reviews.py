@@ -0,0 +1,11 @@
+from ads.importing import BaseImportCommand
+from reviews.importing import ReviewImporter
+
+
+class Command(BaseImportCommand):
+    help = (
+        "Imports reviews from an NDJSON or CSV file with `ad`, `text` and "
+        "`author_email` columns, and updates the review counters of their ads."
+    )
+    importer_class = ReviewImporter
+    label = "reviews"
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ads.models import Ad
+from reviews import counters
+
+
+class Command(BaseCommand):
+    help = "Recomputes `reviews_count` and `last_review_at` of every ad."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of ads updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        ad_ids = Ad.objects.order_by("pk").values_list("pk", flat=True)
+        batch_size = options["batch_size"]
+
+        total, last_id = 0, 0
+        while batch := list(ad_ids.filter(pk__gt=last_id)[:batch_size]):
+            with transaction.atomic():
+                counters.rebuild(batch)
+            total += len(batch)
+            last_id = batch[-1]
+
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt review counters of {total} ads.")
+            )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    Review = apps.get_model("reviews", "Review")
+    Review.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0002_alter_review_options_alter_review_ad_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="review",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="The date and time the review was last changed"
+            ),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -25,6 +25,9 @@ class Review(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, help_text="The date and time the review was created"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="The date and time the review was last changed"
+    )
 
     class Meta:
         ordering = ["created_at"]
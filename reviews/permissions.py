@@ -8,4 +8,4 @@ class IsReviewAuthor(BasePermission):
 
     @override
     def has_object_permission(self, request, view, review) -> bool:
-        return review.author == request.user
+        return review.author_id == request.user.pk
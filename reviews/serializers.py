@@ -6,5 +6,16 @@ from .models import Review
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ("id", "text", "author", "ad", "created_at")
-        read_only_fields = ("author", "ad", "created_at")
+        fields = ("id", "text", "author", "ad", "created_at", "updated_at")
+        read_only_fields = ("author", "ad", "created_at", "updated_at")
+
+
+class ReviewImportSerializer(serializers.ModelSerializer):
+    """One row of `manage.py import_reviews`, the author is given by email."""
+
+    ad = serializers.IntegerField(source="ad_id", min_value=1)
+    author_email = serializers.EmailField()
+
+    class Meta:
+        model = Review
+        fields = ("ad", "text", "author_email")
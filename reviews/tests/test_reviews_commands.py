@@ -0,0 +1,107 @@
+import json
+import threading
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from ads.models import Ad
+from reviews.importing import ReviewImporter
+from reviews.models import Review
+
+# rebuild_review_counters
+
+
+@pytest.mark.django_db
+def test_rebuild_review_counters(ad_factory, review_factory):
+    reviewed_ad, empty_ad = ad_factory(), ad_factory()
+    reviews = [review_factory(ad=reviewed_ad) for _ in range(3)]
+    Ad.objects.update(reviews_count=42, last_review_at=None)
+
+    call_command("rebuild_review_counters", batch_size=1)
+
+    reviewed_ad.refresh_from_db()
+    empty_ad.refresh_from_db()
+    assert reviewed_ad.reviews_count == len(reviews)
+    assert reviewed_ad.last_review_at == max(review.created_at for review in reviews)
+    assert empty_ad.reviews_count == 0
+    assert empty_ad.last_review_at is None
+
+
+# import_reviews
+
+
+@pytest.mark.django_db
+def test_import_reviews(tmp_path, ad_factory, user):
+    first_ad, second_ad = ad_factory(), ad_factory()
+    rows = [
+        {"ad": first_ad.id, "text": "Great", "author_email": user.email},
+        {"ad": first_ad.id, "text": "Fine", "author_email": user.email},
+        {"ad": second_ad.id, "text": "Meh", "author_email": user.email},
+        {"ad": second_ad.id + 100, "text": "Lost", "author_email": user.email},
+        {"ad": second_ad.id, "text": "", "author_email": user.email},
+    ]
+    path = tmp_path / "reviews.ndjson"
+    path.write_text("\n".join(json.dumps(row) for row in rows))
+    stdout, stderr = StringIO(), StringIO()
+
+    call_command("import_reviews", path, batch_size=2, stdout=stdout, stderr=stderr)
+
+    assert Review.objects.count() == 3
+    assert "Imported 3 reviews, skipped 2 invalid" in stdout.getvalue()
+    assert "line 4:" in stderr.getvalue() and "line 5:" in stderr.getvalue()
+    first_ad.refresh_from_db()
+    second_ad.refresh_from_db()
+    assert first_ad.reviews_count == 2
+    assert second_ad.reviews_count == 1
+    assert second_ad.last_review_at == Review.objects.get(text="Meh").created_at
+
+
+@pytest.mark.django_db(transaction=True)
+def test_import_reviews_concurrent_batches_sharing_an_ad(ad_factory, user):
+    if connection.vendor != "postgresql":
+        pytest.skip("row locks are taken on PostgreSQL")
+    shared_ad, first_ad, second_ad = ad_factory(), ad_factory(), ad_factory()
+    batches = {
+        text: [
+            (1, {"ad": shared_ad.id, "text": text, "author_email": user.email}),
+            (2, {"ad": ad.id, "text": text, "author_email": user.email}),
+        ]
+        for text, ad in (("first", first_ad), ("second", second_ad))
+    }
+    written = {text: threading.Event() for text in batches}
+    failures = []
+
+    class Importer(ReviewImporter):
+        def write(self, objects):
+            # the foreign key is checked, and the ad locked, by every insert
+            with connection.cursor() as cursor:
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            super().write(objects)
+            # the other batch gets the chance to write before this one recounts
+            text = objects[0].text
+            written[text].set()
+            (other,) = written.keys() - {text}
+            written[other].wait(timeout=0.5)
+
+    def import_batch(records):
+        try:
+            Importer().import_batch(records)
+        except Exception as exc:
+            failures.append(exc)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=import_batch, args=(records,))
+        for records in batches.values()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    shared_ad.refresh_from_db()
+    assert shared_ad.reviews_count == 2
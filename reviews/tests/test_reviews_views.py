@@ -1,8 +1,14 @@
+from datetime import timedelta
+
 import pytest
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import status
 
+from ads.models import Ad
 from reviews.models import Review
+from reviews.views import ReviewViewSet
 
 # fixtures
 
@@ -37,6 +43,44 @@ def test_reviews_list_success(api_client, reviews):
     assert len(response.data) == len(reviews)
 
 
+@pytest.mark.django_db
+def test_reviews_list_not_modified(api_client, reviews):
+    url = reverse("ads:ads-review-list", args=[reviews[0].ad.id])
+    api_client.force_authenticate(reviews[0].author)
+    etag = api_client.get(url)["ETag"]
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_reviews_list_modified_after_delete(api_client, reviews):
+    url = reverse("ads:ads-review-list", args=[reviews[0].ad.id])
+    api_client.force_authenticate(reviews[0].author)
+    etag = api_client.get(url)["ETag"]
+
+    reviews[0].delete()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data) == len(reviews) - 1
+
+
+@pytest.mark.django_db
+def test_reviews_list_without_last_modified(api_client, reviews):
+    url = reverse("ads:ads-review-list", args=[reviews[0].ad.id])
+    api_client.force_authenticate(reviews[0].author)
+    response = api_client.get(url)
+    assert "Last-Modified" not in response
+
+    reviews[0].delete()
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data) == len(reviews) - 1
+
+
 @pytest.mark.django_db
 def test_reviews_list_ad_not_found(api_client, reviews):
     api_client.force_authenticate(reviews[0].author)
@@ -79,6 +123,36 @@ def test_reviews_create_success(api_client, ad, user, review_data):
     assert review.ad == ad
 
 
+@pytest.mark.django_db
+def test_reviews_create_updates_ad_counters(api_client, ad, user, review_data):
+    api_client.force_authenticate(user)
+    response = api_client.post(
+        reverse("ads:ads-review-list", args=[ad.id]), review_data
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    ad.refresh_from_db()
+    assert ad.reviews_count == 1
+    assert ad.last_review_at == Review.objects.get(id=response.data["id"]).created_at
+
+
+@pytest.mark.django_db
+def test_reviews_create_keeps_later_last_review_at(api_client, ad, user, review_data):
+    # a review created after this one whose transaction committed first
+    later = timezone.now() + timedelta(minutes=1)
+    Ad.objects.filter(id=ad.id).update(reviews_count=1, last_review_at=later)
+
+    api_client.force_authenticate(user)
+    response = api_client.post(
+        reverse("ads:ads-review-list", args=[ad.id]), review_data
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    ad.refresh_from_db()
+    assert ad.reviews_count == 2
+    assert ad.last_review_at == later
+
+
 # retrieve
 
 
@@ -99,6 +173,28 @@ def test_reviews_retrieve_success(api_client, ad, review):
     assert response.data.get("id") == review.id
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("ad_id, review_id", [(None, "abc"), ("abc", None)])
+def test_reviews_retrieve_non_numeric_id(api_client, ad, review, ad_id, review_id):
+    api_client.force_authenticate(review.author)
+    response = api_client.get(
+        reverse("ads:ads-review-detail", args=[ad_id or ad.id, review_id or review.id])
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_reviews_retrieve_not_modified(api_client, ad, review):
+    url = reverse("ads:ads-review-detail", args=[ad.id, review.id])
+    api_client.force_authenticate(review.author)
+    last_modified = api_client.get(url)["Last-Modified"]
+
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
 # update
 
 
@@ -173,6 +269,23 @@ def test_reviews_delete_as_author_success(api_client, ad, review):
     assert not Review.objects.filter(id=review.id).exists()
 
 
+@pytest.mark.django_db
+def test_reviews_delete_updates_ad_counters(api_client, ad, user, review_data):
+    api_client.force_authenticate(user)
+    url = reverse("ads:ads-review-list", args=[ad.id])
+    first = api_client.post(url, review_data).data
+    second = api_client.post(url, review_data).data
+
+    response = api_client.delete(
+        reverse("ads:ads-review-detail", args=[ad.id, second["id"]])
+    )
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    ad.refresh_from_db()
+    assert ad.reviews_count == 1
+    assert ad.last_review_at == Review.objects.get(id=first["id"]).created_at
+
+
 @pytest.mark.django_db
 def test_reviews_delete_as_random_user_fail(api_client, ad, review, random_user):
     api_client.force_authenticate(random_user)
@@ -193,3 +306,80 @@ def test_reviews_delete_as_admin_success(api_client, ad, review, admin):
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert not Review.objects.filter(id=review.id).exists()
+
+
+# async
+
+
+@pytest.mark.django_db
+def test_reviews_async_list_matches_sync(api_client, reviews, call_async_view):
+    ad, author = reviews[0].ad, reviews[0].author
+    api_client.force_authenticate(author)
+    expected = api_client.get(reverse("ads:ads-review-list", args=[ad.id]))
+
+    # URL kwargs are strings, the ETag includes the `ad_pk` as given
+    response = call_async_view(
+        ReviewViewSet, "get", "list", user=author, ad_pk=str(ad.id)
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == expected.data
+    assert response["ETag"] == expected["ETag"]
+
+
+@pytest.mark.django_db
+def test_reviews_async_list_ad_not_found(user, call_async_view):
+    response = call_async_view(ReviewViewSet, "get", "list", user=user, ad_pk=0)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_reviews_async_retrieve_non_numeric_id(ad, review, call_async_view):
+    response = call_async_view(
+        ReviewViewSet, "get", "retrieve", user=review.author, ad_pk=ad.id, pk="abc"
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_reviews_async_retrieve(ad, review, call_async_view):
+    response = call_async_view(
+        ReviewViewSet, "get", "retrieve", user=review.author, ad_pk=ad.id, pk=review.id
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["id"] == review.id
+
+    response = call_async_view(
+        ReviewViewSet,
+        "get",
+        "retrieve",
+        user=review.author,
+        ad_pk=ad.id,
+        pk=review.id,
+        headers={"If-Modified-Since": response["Last-Modified"]},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+# query counts
+
+
+@pytest.mark.django_db
+def test_reviews_queries_per_action(
+    api_client, ad, review, review_data, assert_action_queries
+):
+    list_url = reverse("ads:ads-review-list", args=[ad.id])
+    detail_url = reverse("ads:ads-review-detail", args=[ad.id, review.id])
+    api_client.force_authenticate(review.author)
+
+    # ad + validators + rows
+    assert_action_queries(3, "get", list_url)
+    assert_action_queries(3, "get", detail_url)
+    # ad + insert + counters, inside a savepoint
+    assert_action_queries(5, "post", list_url, review_data)
+    # ad + row + update, the author check does not load the author
+    assert_action_queries(3, "patch", detail_url, {"text": "UPDATED"})
+    # ad + keys + delete + counters, inside a savepoint
+    assert_action_queries(6, "delete", detail_url)
@@ -1,13 +1,18 @@
 from typing import override
 
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Count, Max
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import viewsets
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from ads.mixins import AsyncViewSetMixin, ConditionalGetMixin, aget_object_or_404
 from ads.models import Ad
 from users.permissions import IsRoleAdmin
 
+from . import counters
 from .models import Review
 from .permissions import IsReviewAuthor
 from .serializers import ReviewSerializer
@@ -16,11 +21,14 @@ from .serializers import ReviewSerializer
 @extend_schema(tags=["reviews"])
 @extend_schema_view(
     list=extend_schema(
-        summary="List all reviews", description="Retrieves a list of all reviews."
+        summary="List all reviews",
+        description="Retrieves a list of all reviews. Supports conditional requests "
+        "with `If-None-Match`.",
     ),
     retrieve=extend_schema(
         summary="Retrieve a review",
-        description="Retrieves the details of a specific review.",
+        description="Retrieves the details of a specific review. Supports "
+        "conditional requests with `If-None-Match` and `If-Modified-Since`.",
     ),
     create=extend_schema(
         summary="Create a new review", description="Creates a new review."
@@ -34,18 +42,31 @@ from .serializers import ReviewSerializer
     ),
     destroy=extend_schema(summary="Delete a review", description="Deletes a review."),
 )
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
 
     def get_ad(self) -> Ad:
         if not hasattr(self, "_ad"):
-            self._ad = get_object_or_404(Ad, pk=self.kwargs.get("ad_pk"))
+            self._ad = get_object_or_404(
+                Ad.objects.only("id"), pk=self.kwargs.get("ad_pk")
+            )
+        return self._ad
+
+    async def aget_ad(self) -> Ad:
+        if not hasattr(self, "_ad"):
+            self._ad = await aget_object_or_404(
+                Ad.objects.only("id"), pk=self.kwargs.get("ad_pk")
+            )
         return self._ad
 
     @override
     def get_queryset(self):
-        return super().get_queryset().filter(ad=self.get_ad())
+        queryset = super().get_queryset().filter(ad=self.get_ad())
+        if self.action == "destroy":
+            # the permission check, the delete and the ad counters only need keys
+            queryset = queryset.only("id", "author", "ad")
+        return queryset
 
     @override
     def get_permissions(self):
@@ -55,6 +76,73 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
         return [permission() for permission in permissions]
 
+    # the count catches deletions, which do not move the latest `updated_at`
+    list_state = {"count": Count("id"), "last_modified": Max("updated_at")}
+
+    def get_list_etag(self, state: dict) -> str:
+        # no `Last-Modified`, a date cannot tell a deleted review apart
+        last_modified = state["last_modified"]
+        return self.make_etag(
+            self.kwargs["ad_pk"],
+            state["count"],
+            last_modified and last_modified.timestamp(),
+        )
+
+    @override
+    def list(self, request, *args, **kwargs):
+        state = self.get_queryset().aggregate(**self.list_state)
+        etag = self.get_list_etag(state)
+        if not_modified := self.get_not_modified(etag, None):
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag, None)
+
+    async def alist(self, request, *args, **kwargs):
+        await self.aget_ad()
+        state = await self.get_queryset().aaggregate(**self.list_state)
+        etag = self.get_list_etag(state)
+        if not_modified := self.get_not_modified(etag, None):
+            return not_modified
+
+        reviews = [review async for review in self.get_queryset().aiterator()]
+        response = Response(self.get_serializer(reviews, many=True).data)
+        return self.set_validators(response, etag, None)
+
+    @override
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        updated_at = get_object_or_404(
+            self.get_queryset().values_list("updated_at", flat=True), pk=pk
+        )
+        etag = self.make_etag(self.kwargs["ad_pk"], pk, updated_at.timestamp())
+        if not_modified := self.get_not_modified(etag, updated_at):
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        return self.set_validators(response, etag, updated_at)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        await self.aget_ad()
+        pk = kwargs[self.lookup_field]
+        updated_at = await aget_object_or_404(
+            self.get_queryset().values_list("updated_at", flat=True), pk=pk
+        )
+        etag = self.make_etag(self.kwargs["ad_pk"], pk, updated_at.timestamp())
+        if not_modified := self.get_not_modified(etag, updated_at):
+            return not_modified
+
+        response = Response(self.get_serializer(await self.aget_object()).data)
+        return self.set_validators(response, etag, updated_at)
+
     @override
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, ad=self.get_ad())
+        with transaction.atomic():
+            review = serializer.save(author=self.request.user, ad=self.get_ad())
+            counters.review_added(review)
+
+    @override
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            counters.review_removed(instance)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth import admin as auth_admin
 
-from .models import User
+from .models import OutboxEmail, User
 
 
 @admin.register(User)
@@ -42,3 +42,20 @@ class UserAdmin(auth_admin.UserAdmin):
     add_fieldsets = (
         (None, {"classes": ("wide",), "fields": ("email", "password", "password2")}),
     )
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status",)
+    # message bodies may carry live tokens, like the links of password resets
+    exclude = ("message",)
+    readonly_fields = ("subject", "recipients", "attempts", "last_error", "created_at")
+
+    @admin.display(description="Subject")
+    def subject(self, obj: OutboxEmail) -> str:
+        return obj.message["subject"]
+
+    @admin.display(description="Recipients")
+    def recipients(self, obj: OutboxEmail) -> str:
+        return ", ".join(obj.message["to"])
@@ -0,0 +1,178 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
+from typing import override
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .revocation import revocation_list
+
+User = get_user_model()
+
+# claims copied from the user into every token, see `set_user_claims`
+USER_CLAIMS = ("role", "is_active")
+
+
+def set_user_claims(token, user) -> None:
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Stateless user of read requests, built from the claims of the access token.
+
+    Claims are as fresh as the token, so a promotion reaches read requests when
+    the user's access token is refreshed. Deactivating a user or taking away the
+    admin role revokes their tokens instead, see `users.signals`.
+    """
+
+    @cached_property
+    @override
+    def id(self) -> int:
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def role(self) -> str:
+        return self.token["role"]
+
+    @cached_property
+    def is_active(self) -> bool:
+        return self.token["is_active"]
+
+    def is_admin(self) -> bool:
+        return self.role == User.UserRole.ADMIN
+
+
+class UserCache:
+    """
+    Per-process LRU of user rows for write requests.
+
+    Entries live for `USERS_AUTH_CACHE_TTL` seconds and at most
+    `USERS_AUTH_CACHE_MAX_ENTRIES` are kept. Saving or deleting a user drops it
+    from this process right away (see `users.signals`), other processes see the
+    change once their entry expires. Every lookup returns a copy, so requests
+    never share or mutate the cached instance.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            # pk -> (expiry, user), least recently used first
+            self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+
+    def get(self, pk: int) -> User | None:
+        now = time.monotonic()
+        with self._lock:
+            expires_at, user = self._users.get(pk, (0.0, None))
+            if expires_at > now:
+                self._users.move_to_end(pk)
+                return copy.copy(user)
+
+        user = User.objects.filter(pk=pk).first()
+        if user is None:
+            return None
+
+        with self._lock:
+            self._users[pk] = (now + settings.USERS_AUTH_CACHE_TTL, user)
+            self._users.move_to_end(pk)
+            while len(self._users) > settings.USERS_AUTH_CACHE_MAX_ENTRIES:
+                self._users.popitem(last=False)
+        return copy.copy(user)
+
+    def discard(self, pk: int) -> None:
+        with self._lock:
+            self._users.pop(pk, None)
+
+
+user_cache = UserCache()
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not query the user table on most requests.
+
+    Safe (read) requests get a `ClaimsUser` built from the `role` and
+    `is_active` claims of the token. Other requests get a `User` from the
+    per-process `user_cache`. Tokens issued without these claims always take
+    the `user_cache` path. Revoked tokens are rejected, see `users.revocation`.
+
+    The result is kept on the Django request, so a middleware that needs the
+    user before the view, like `config.middleware.ReplicaRoutingMiddleware`,
+    does not make DRF authenticate the request a second time.
+    """
+
+    @override
+    def authenticate(self, request):
+        # the Django request, also when called with the DRF `Request` around it
+        http_request = getattr(request, "_request", request)
+        if hasattr(http_request, "_jwt_authenticated"):
+            return http_request._jwt_authenticated
+
+        authenticated = self.authenticate_token(request)
+        http_request._jwt_authenticated = authenticated
+        return authenticated
+
+    def authenticate_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS and all(
+            claim in validated_token for claim in USER_CLAIMS
+        ):
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    @override
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(validated_token):
+            raise InvalidToken(_("Token is revoked"))
+        return validated_token
+
+    def get_claims_user(self, validated_token) -> ClaimsUser:
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = ClaimsUser(validated_token)
+        self.check_active(user)
+        return user
+
+    @override
+    def get_user(self, validated_token) -> User:
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        user = user_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        self.check_active(user)
+        return user
+
+    def check_active(self, user) -> None:
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
@@ -0,0 +1,180 @@
+import io
+import math
+import re
+import threading
+import uuid
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import gettext_lazy as _
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from rest_framework.exceptions import ValidationError
+
+# format of `USERS_AVATAR_FORMATS` -> Pillow format, content type
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+}
+
+# file name `process_avatar` stores avatars under, avatars uploaded before they
+# were processed have the name they were uploaded with
+PROCESSED_NAME = re.compile(r"[0-9a-f]{32}\.webp")
+
+# bytes read at most to find the size of an uploaded image, room for EXIF, ICC
+# profiles and XMP in front of it
+HEADER_MAX_SIZE = 1024 * 1024
+
+_variant_locks: dict[str, threading.Lock] = {}
+_variant_locks_lock = threading.Lock()
+
+
+def available_formats() -> list[str]:
+    """Formats of `USERS_AVATAR_FORMATS` that this Pillow build can encode."""
+
+    return [
+        image_format
+        for image_format in settings.USERS_AVATAR_FORMATS
+        if image_format in FORMATS and features.check(image_format)
+    ]
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    # metadata is only written when passed to `save`, so none is
+    buffer = io.BytesIO()
+    image.save(buffer, FORMATS[image_format][0], quality=settings.USERS_AVATAR_QUALITY)
+    return buffer.getvalue()
+
+
+class AvatarUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded avatars to temporary files, checking them chunk by chunk.
+
+    An upload is rejected as soon as it is larger than
+    `USERS_AVATAR_MAX_UPLOAD_SIZE` bytes, its header is not one of an image
+    Pillow can open or the image has more than `USERS_AVATAR_MAX_PIXELS`
+    pixels, so the rest of it is neither stored nor parsed.
+    """
+
+    def new_file(self, *args, **kwargs) -> None:
+        super().new_file(*args, **kwargs)
+        # bytes read so far until the image is identified, `None` after
+        self.header: bytes | None = b""
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> None:
+        max_upload_size = settings.USERS_AVATAR_MAX_UPLOAD_SIZE
+        if start + len(raw_data) > max_upload_size:
+            self.reject(
+                _("Image is larger than %(size)s.")
+                % {"size": filesizeformat(max_upload_size)}
+            )
+        if self.header is not None:
+            self.header += raw_data
+            self.check_header(complete=False)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size: int):
+        if self.header is not None:
+            self.check_header(complete=True)
+        return super().file_complete(file_size)
+
+    def check_header(self, complete: bool) -> None:
+        try:
+            with Image.open(io.BytesIO(self.header)) as image:
+                pixels = image.width * image.height
+        except Image.DecompressionBombError:
+            pixels = math.inf
+        except (UnidentifiedImageError, OSError):
+            # a header cut in the middle cannot be told from an invalid one
+            if complete or len(self.header) >= HEADER_MAX_SIZE:
+                self.reject(_("Upload a valid image."))
+            return
+
+        self.header = None
+        if pixels > settings.USERS_AVATAR_MAX_PIXELS:
+            self.reject(_("Image has too many pixels."))
+
+    def reject(self, message: str) -> None:
+        self.file.close()
+        raise ValidationError({self.field_name: [message]})
+
+
+def process_avatar(file) -> ContentFile:
+    """
+    Decodes an uploaded image once and returns it as the stored avatar.
+
+    The avatar is rotated as its EXIF orientation says, downsized to
+    `USERS_AVATAR_MAX_SIZE` pixels on its longest side and encoded as WebP
+    without any metadata, under a random name.
+    """
+
+    max_size = settings.USERS_AVATAR_MAX_SIZE
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            if image.width * image.height > settings.USERS_AVATAR_MAX_PIXELS:
+                raise ValidationError(_("Image has too many pixels."))
+            # JPEG is decoded at the smallest scale still covering `max_size`
+            image.draft("RGB", (max_size, max_size))
+            image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ValidationError(_("Upload a valid image.")) from exc
+
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    return ContentFile(_encode(image, "webp"), name=f"{uuid.uuid4().hex}.webp")
+
+
+def is_processed(name: str) -> bool:
+    """Whether the stored avatar was made by `process_avatar` and has variants."""
+
+    return PROCESSED_NAME.fullmatch(PurePosixPath(name).name) is not None
+
+
+def variant_name(name: str, size: int, image_format: str) -> str:
+    """Storage name of a variant, next to the avatar `name` it is made from."""
+
+    return f"{PurePosixPath(name).with_suffix('')}/{size}.{image_format}"
+
+
+def get_variant(name: str, size: int, image_format: str) -> str:
+    """
+    Returns the storage name of a variant of the avatar, made on first access.
+
+    Variants are kept in the storage, so every later access, from any process,
+    is a plain file read. A process makes each variant once at a time.
+    """
+
+    variant = variant_name(name, size, image_format)
+    if default_storage.exists(variant):
+        return variant
+
+    with _variant_locks_lock:
+        lock = _variant_locks.setdefault(variant, threading.Lock())
+    with lock:
+        if not default_storage.exists(variant):
+            with default_storage.open(name) as file, Image.open(file) as image:
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                content = ContentFile(_encode(image, image_format))
+            saved = default_storage.save(variant, content)
+            # another process saved it first, its copy is kept
+            if saved != variant:
+                default_storage.delete(saved)
+    with _variant_locks_lock:
+        _variant_locks.pop(variant, None)
+    return variant
+
+
+def delete_avatar(name: str) -> None:
+    """Deletes the avatar and all its variants from the storage."""
+
+    variants_dir = str(PurePosixPath(name).with_suffix(""))
+    if default_storage.exists(variants_dir):
+        for file_name in default_storage.listdir(variants_dir)[1]:
+            default_storage.delete(f"{variants_dir}/{file_name}")
+        default_storage.delete(variants_dir)
+    default_storage.delete(name)
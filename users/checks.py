@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_revocation_cache(app_configs, **kwargs) -> list:
+    """
+    Revoked tokens and cached ads must live in a cache shared by every process,
+    with a cache of each process a token revoked in one worker stays valid in
+    the others and an ad changed in one worker stays cached in the others.
+    """
+
+    if not isinstance(caches["default"], LocMemCache):
+        return []
+
+    message = (
+        "Revoked tokens and cached ads are kept in a per-process cache "
+        "(LocMemCache)."
+    )
+    hint = (
+        "Set CACHE_BACKEND to a cache shared by every process, such as "
+        "django.core.cache.backends.redis.RedisCache."
+    )
+    # a single development server is the only process
+    if settings.DEBUG:
+        return [Warning(message, hint=hint, id="users.W001")]
+    return [Error(message, hint=hint, id="users.E001")]
+
+
+@register()
+def check_hashing_pool(app_configs, **kwargs) -> list:
+    """
+    Requests wait in their thread for the password they hash, a hashing pool
+    with as many slots as there are request threads lets a login storm take
+    every thread before any login is rejected.
+    """
+
+    threads = settings.GUNICORN_THREADS
+    slots = settings.USERS_HASHING_WORKERS + settings.USERS_HASHING_QUEUE_SIZE
+    # a single thread cannot be shared either way
+    if threads <= 1 or slots < threads:
+        return []
+    return [
+        Error(
+            f"{slots} hashed and queued passwords leave none of the {threads} "
+            "request threads free.",
+            hint="Lower USERS_HASHING_WORKERS or USERS_HASHING_QUEUE_SIZE, their "
+            "sum must stay below GUNICORN_THREADS.",
+            id="users.E002",
+        )
+    ]
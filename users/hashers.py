@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many password checks at once, try again shortly.")
+    default_code = "hashing_unavailable"
+
+    def __init__(self) -> None:
+        super().__init__()
+        # sent as `Retry-After` by the exception handler of DRF
+        self.wait = settings.USERS_HASHING_RETRY_AFTER
+
+
+class HashingPool:
+    """
+    Bounded per-process thread pool that hashes passwords.
+
+    At most `USERS_HASHING_WORKERS` passwords are hashed at once, up to
+    `USERS_HASHING_QUEUE_SIZE` more wait for a thread and any further hash is
+    rejected right away with `HashingUnavailable`. A login storm thus holds a
+    fixed share of the CPU, and requests of other threads, like ad listings,
+    keep being served: scrypt, Argon2 and PBKDF2 release the GIL while hashing.
+    Callers wait for their hash in their own thread, so the slots must stay
+    below the request threads of the server, see `users.checks`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._size: tuple[int, int] | None = None
+
+    def run(self, function, *args, **kwargs):
+        # hashers call each other, e.g. `verify` calls `encode`
+        if getattr(self._local, "hashing", False):
+            return function(*args, **kwargs)
+
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            raise HashingUnavailable()
+        try:
+            future = executor.submit(self._call, partial(function, *args, **kwargs))
+            return future.result()
+        finally:
+            slots.release()
+
+    def _call(self, function):
+        self._local.hashing = True
+        return function()
+
+    def _get_executor(self) -> tuple[ThreadPoolExecutor, threading.Semaphore]:
+        size = (settings.USERS_HASHING_WORKERS, settings.USERS_HASHING_QUEUE_SIZE)
+        with self._lock:
+            # created on first use, after the server forked its workers
+            if self._size != size:
+                if self._size is not None:
+                    self._executor.shutdown(wait=False)
+                workers, queue_size = size
+                self._executor = ThreadPoolExecutor(
+                    workers, thread_name_prefix="password-hashing"
+                )
+                self._slots = threading.BoundedSemaphore(workers + queue_size)
+                self._size = size
+            return self._executor, self._slots
+
+
+hashing_pool = HashingPool()
+
+
+class PooledHasherMixin:
+    """Hashes and verifies passwords in `hashing_pool`."""
+
+    def encode(self, *args, **kwargs):
+        return hashing_pool.run(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return hashing_pool.run(super().verify, *args, **kwargs)
+
+
+class ScryptPasswordHasher(PooledHasherMixin, hashers.ScryptPasswordHasher):
+    """
+    Scrypt with the cost parameters of the `USERS_SCRYPT_*` settings.
+
+    Hashes made with other parameters are verified with their own and rehashed
+    on the next successful login, see `calibrate_password_hasher`.
+    """
+
+    @property
+    def work_factor(self) -> int:
+        return settings.USERS_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self) -> int:
+        return settings.USERS_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self) -> int:
+        return settings.USERS_SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self) -> int:
+        # room for the largest stored hash, OpenSSL's default cap is 32 MiB
+        return 2 * 128 * max(self.work_factor, 2**17) * self.block_size
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2id with the cost parameters of the `USERS_ARGON2_*` settings.
+
+    Needs the optional `argon2-cffi` package.
+    """
+
+    @property
+    def time_cost(self) -> int:
+        return settings.USERS_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self) -> int:
+        return settings.USERS_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self) -> int:
+        return settings.USERS_ARGON2_PARALLELISM
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2 of Django, kept to verify and upgrade old hashes."""
@@ -0,0 +1,152 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# seconds between deletions of failed emails past their retention
+PURGE_INTERVAL = 3600
+
+# `EmailMessage` attributes stored in the outbox
+MESSAGE_FIELDS = ("subject", "body", "from_email", "to", "cc", "bcc", "reply_to")
+
+
+def serialize_message(message) -> dict:
+    if message.attachments:
+        raise ValueError("The outbox does not support attachments.")
+    return {field: getattr(message, field) for field in MESSAGE_FIELDS} | {
+        "headers": message.extra_headers,
+        "alternatives": [list(alt) for alt in getattr(message, "alternatives", [])],
+    }
+
+
+def redact_message(data: dict) -> dict:
+    """The stored message without its content, which may carry live tokens."""
+
+    return data | {"body": "", "headers": {}, "alternatives": []}
+
+
+def deserialize_message(data: dict) -> EmailMultiAlternatives:
+    fields = {field: data[field] for field in MESSAGE_FIELDS}
+    return EmailMultiAlternatives(
+        **fields,
+        headers=data["headers"],
+        alternatives=[tuple(alt) for alt in data["alternatives"]],
+    )
+
+
+class OutboxBackend(BaseEmailBackend):
+    """
+    Email backend that queues messages in the `OutboxEmail` table.
+
+    Sending costs a single insert, in the transaction of the caller, and the
+    messages are delivered by `manage.py run_mail_worker`.
+    """
+
+    def send_messages(self, email_messages) -> int:
+        emails = [
+            OutboxEmail(message=serialize_message(message))
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxEmail.objects.bulk_create(emails)
+        return len(emails)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts."""
+
+    seconds = settings.USERS_MAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.USERS_MAIL_RETRY_MAX_DELAY))
+
+
+class MailWorker:
+    """
+    Delivers due outbox emails over one reused connection.
+
+    The connection of `USERS_MAIL_DELIVERY_BACKEND` is opened once and kept
+    open while there are messages to send, and closed when the outbox is
+    drained, before the server drops it as idle. Delivered messages are
+    deleted. Failed ones are retried with exponential backoff and are marked
+    as failed after `USERS_MAIL_MAX_ATTEMPTS` attempts, with their content
+    blanked, and deleted `USERS_MAIL_FAILED_RETENTION` days after they were
+    queued.
+
+    Due rows are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so any
+    number of workers can run side by side.
+    """
+
+    def __init__(self, batch_size: int = 50) -> None:
+        self.batch_size = batch_size
+        self.connection = get_connection(settings.USERS_MAIL_DELIVERY_BACKEND)
+        self.purged_at: float | None = None
+
+    def deliver_batch(self) -> tuple[int, int]:
+        """Delivers one batch, returns the number of sent and failed emails."""
+
+        with transaction.atomic():
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                    status=OutboxEmail.Status.PENDING,
+                    next_attempt_at__lte=timezone.now(),
+                )[: self.batch_size]
+            )
+            if not emails:
+                self.close()
+                self.purge()
+                return 0, 0
+
+            sent, failed = [], []
+            for email in emails:
+                try:
+                    # a no-op while the connection is open
+                    self.connection.open()
+                    self.connection.send_messages([deserialize_message(email.message)])
+                except Exception as exc:
+                    self.fail(email, exc)
+                    failed.append(email)
+                    # the connection may be broken, the next message reconnects
+                    self.close()
+                else:
+                    sent.append(email.pk)
+
+            OutboxEmail.objects.filter(pk__in=sent).delete()
+            OutboxEmail.objects.bulk_update(
+                failed,
+                ["message", "status", "attempts", "next_attempt_at", "last_error"],
+            )
+        return len(sent), len(failed)
+
+    def fail(self, email: OutboxEmail, exc: Exception) -> None:
+        email.attempts += 1
+        email.last_error = f"{type(exc).__name__}: {exc}"
+        if email.attempts >= settings.USERS_MAIL_MAX_ATTEMPTS:
+            email.status = OutboxEmail.Status.FAILED
+            email.message = redact_message(email.message)
+        else:
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+    def purge(self) -> None:
+        """Deletes failed emails queued more than the retention period ago."""
+
+        now = time.monotonic()
+        if self.purged_at is not None and now - self.purged_at < PURGE_INTERVAL:
+            return
+        self.purged_at = now
+        OutboxEmail.objects.filter(
+            status=OutboxEmail.Status.FAILED,
+            created_at__lt=timezone.now()
+            - timedelta(days=settings.USERS_MAIL_FAILED_RETENTION),
+        ).delete()
+
+    def close(self) -> None:
+        try:
+            self.connection.close()
+        except Exception:
+            # closing a broken connection fails as well, it is dropped anyway
+            pass
@@ -0,0 +1,111 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from users.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+# time cost of Argon2 is not raised past this, more memory is better spent
+MAX_ARGON2_TIME_COST = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures password hashing on this host and prints the cost settings that "
+        "hash a password in about the target time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasher",
+            choices=list(settings.PASSWORD_HASHER_PROFILES),
+            default=settings.USERS_PASSWORD_HASHER,
+            help="Profile to calibrate, `USERS_PASSWORD_HASHER` by default.",
+        )
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=100,
+            help="Time budget of one hash in milliseconds.",
+        )
+        parser.add_argument(
+            "--max-memory",
+            type=int,
+            default=64,
+            help="Memory one hash may use in MiB, per concurrent login.",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Hashes measured per candidate, the median is used.",
+        )
+
+    def handle(self, *args, **options):
+        self.rounds = options["rounds"]
+        calibrate = getattr(self, f"calibrate_{options['hasher']}")
+        params, elapsed = calibrate(options["target_ms"], options["max_memory"])
+
+        self.stdout.write(f"# {elapsed:.0f} ms per hash on this host")
+        for name, value in params.items():
+            self.stdout.write(f"{name}={value}")
+
+    def calibrate_scrypt(self, target_ms: float, max_memory: int):
+        # memory is 128 * work factor * block size bytes, time grows linearly
+        # with the work factor and the parallelism, which OpenSSL runs serially
+        params = {
+            "USERS_SCRYPT_WORK_FACTOR": 2**10,
+            "USERS_SCRYPT_BLOCK_SIZE": 8,
+            "USERS_SCRYPT_PARALLELISM": 1,
+        }
+        max_work_factor = max_memory * 2**20 // (128 * 8)
+
+        elapsed = self.measure(ScryptPasswordHasher(), params)
+        while (
+            elapsed < target_ms
+            and params["USERS_SCRYPT_WORK_FACTOR"] * 2 <= max_work_factor
+        ):
+            params["USERS_SCRYPT_WORK_FACTOR"] *= 2
+            elapsed = self.measure(ScryptPasswordHasher(), params)
+
+        if elapsed < target_ms:
+            params["USERS_SCRYPT_PARALLELISM"] = int(target_ms // elapsed)
+            elapsed = self.measure(ScryptPasswordHasher(), params)
+        return params, elapsed
+
+    def calibrate_argon2(self, target_ms: float, max_memory: int):
+        try:
+            import argon2  # noqa: F401
+        except ImportError as exc:
+            raise CommandError("Argon2 needs the `argon2-cffi` package.") from exc
+
+        params = {
+            "USERS_ARGON2_TIME_COST": 1,
+            "USERS_ARGON2_MEMORY_COST": max_memory * 1024,
+            "USERS_ARGON2_PARALLELISM": 1,
+        }
+
+        elapsed = self.measure(Argon2PasswordHasher(), params)
+        while elapsed > target_ms and params["USERS_ARGON2_MEMORY_COST"] > 8 * 1024:
+            params["USERS_ARGON2_MEMORY_COST"] //= 2
+            elapsed = self.measure(Argon2PasswordHasher(), params)
+        while (
+            elapsed < target_ms
+            and params["USERS_ARGON2_TIME_COST"] < MAX_ARGON2_TIME_COST
+        ):
+            params["USERS_ARGON2_TIME_COST"] += 1
+            elapsed = self.measure(Argon2PasswordHasher(), params)
+        return params, elapsed
+
+    def measure(self, hasher, params: dict) -> float:
+        """Median time to hash a password with the given settings, in ms."""
+
+        timings = []
+        with override_settings(**params):
+            for _ in range(self.rounds):
+                started = time.perf_counter()
+                hasher.encode("correct horse battery staple", hasher.salt())
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from rest_framework.exceptions import ValidationError
+
+from users.avatars import delete_avatar, is_processed, process_avatar
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs avatars stored before uploads were processed through the avatar "
+        "pipeline, so they are downsized, stripped and get variants."
+    )
+
+    def handle(self, *args, **options):
+        users = (
+            User.objects.exclude(image="")
+            .exclude(image__isnull=True)
+            .only("id", "image")
+            .order_by("pk")
+        )
+
+        processed, failed = 0, 0
+        for user in users.iterator():
+            old_name = user.image.name
+            if is_processed(old_name):
+                continue
+
+            try:
+                with default_storage.open(old_name) as file:
+                    avatar = process_avatar(file)
+            except (OSError, ValidationError) as exc:
+                failed += 1
+                self.stderr.write(f"user {user.pk}: {old_name}: {exc}")
+                continue
+
+            user.image.save(avatar.name, avatar, save=False)
+            # the user may have uploaded another avatar in the meantime
+            if User.objects.filter(pk=user.pk, image=old_name).update(
+                image=user.image.name
+            ):
+                delete_avatar(old_name)
+                processed += 1
+            else:
+                delete_avatar(user.image.name)
+
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Processed {processed} avatars, {failed} could not be read."
+                )
+            )
@@ -0,0 +1,49 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.mail import MailWorker
+
+
+class Command(BaseCommand):
+    help = "Delivers queued emails from the outbox until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Number of emails claimed and delivered per transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling a drained outbox again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no email is due instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        worker = MailWorker(options["batch_size"])
+        self.stopping = False
+        # finish the current batch on SIGTERM/SIGINT instead of dropping it
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            sent, failed = worker.deliver_batch()
+            if (sent or failed) and options["verbosity"] > 0:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            if sent + failed < options["batch_size"]:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        worker.close()
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
@@ -0,0 +1,20 @@
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .hashers import HashingUnavailable
+
+
+class HashingUnavailableMiddleware(MiddlewareMixin):
+    """
+    Answers `HashingUnavailable` outside the API, like at the admin login, with
+    503 and `Retry-After`, as DRF does for API views.
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingUnavailable):
+            return None
+        response = HttpResponse(
+            exception.detail, status=exception.status_code, content_type="text/plain"
+        )
+        response["Retry-After"] = str(exception.wait)
+        return response
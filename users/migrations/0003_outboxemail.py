@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_user_options_alter_user_email_alter_user_image_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "message",
+                    models.JSONField(help_text="Serialized message, see `users.mail`"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "pending"), ("failed", "failed")],
+                        default="pending",
+                        help_text="Pending messages are retried until they fail for good",
+                        max_length=7,
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, help_text="Number of failed delivery attempts"
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The date and time of the next attempt",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, help_text="Error of the last attempt"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="The date and time the email was queued",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbox email",
+                "verbose_name_plural": "Outbox emails",
+                "ordering": ["next_attempt_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="users_outbo_status_44a85f_idx",
+                    )
+                ],
+            },
+        ),
+    ]
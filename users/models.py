@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
+from django.utils import timezone
 
 from .managers import UserManager
 
@@ -53,3 +54,38 @@ class User(AbstractUser):
 
     def is_admin(self) -> bool:
         return self.role == self.UserRole.ADMIN
+
+
+class OutboxEmail(models.Model):
+    """Represents an email waiting for delivery by the mail worker."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        FAILED = "failed", "failed"
+
+    message = models.JSONField(help_text="Serialized message, see `users.mail`")
+    status = models.CharField(
+        max_length=7,
+        choices=Status.choices,
+        default=Status.PENDING,
+        help_text="Pending messages are retried until they fail for good",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, help_text="Number of failed delivery attempts"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, help_text="The date and time of the next attempt"
+    )
+    last_error = models.TextField(blank=True, help_text="Error of the last attempt")
+    created_at = models.DateTimeField(
+        auto_now_add=True, help_text="The date and time the email was queued"
+    )
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+        verbose_name = "Outbox email"
+        verbose_name_plural = "Outbox emails"
+
+    def __str__(self) -> str:
+        return f"{self.message['subject']} to {', '.join(self.message['to'])}"
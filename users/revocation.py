@@ -0,0 +1,190 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+JTI_KEY = "users:revoked:jti:{jti}"
+USER_KEY = "users:revoked:user:{pk}"
+# revocations are also logged in per-minute buckets, so every process can load
+# the ones it has not seen into its Bloom filter
+LOG_BUCKET_SECONDS = 60
+LOG_COUNT_KEY = "users:revoked:log:{bucket}"
+LOG_ENTRY_KEY = "users:revoked:log:{bucket}:{number}"
+
+
+class BloomFilter:
+    """Fixed-size set of strings without false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8])
+        second = int.from_bytes(digest[8:]) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def _max_token_lifetime() -> int:
+    lifetime = max(
+        api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME
+    )
+    return math.ceil(lifetime.total_seconds())
+
+
+class RevocationList:
+    """
+    Revoked JWTs, shared between processes through the default cache.
+
+    A single token is revoked by its `jti` until it expires. All tokens of a
+    user are revoked by a timestamp, tokens issued before it are rejected for
+    as long as any of them may still be valid.
+
+    Every process keeps a Bloom filter of the revocations in front of the
+    cache, so a token that was never revoked, which is nearly every token, is
+    checked without a round trip. The filter loads new revocations from the
+    cache every `USERS_REVOCATION_SYNC_INTERVAL` seconds and is rebuilt once it
+    holds `USERS_REVOCATION_BLOOM_CAPACITY` entries.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drops the local filter, the next check rebuilds it from the cache."""
+
+        with self._lock:
+            self._bloom: BloomFilter | None = None
+            # bucket -> number of its log entries loaded into the filter
+            self._loaded: dict[int, int] = {}
+            self._synced_at = 0.0
+
+    def revoke_token(self, token) -> None:
+        """Revokes one access or refresh token until it expires."""
+
+        timeout = max(1, int(token["exp"] - time.time()))
+        member = f"jti:{token[api_settings.JTI_CLAIM]}"
+        cache.set(JTI_KEY.format(jti=token[api_settings.JTI_CLAIM]), True, timeout)
+        self._log(member, timeout)
+
+    def revoke_user(self, pk: int) -> None:
+        """Revokes every token issued to the user so far."""
+
+        timeout = _max_token_lifetime()
+        cache.set(USER_KEY.format(pk=pk), int(time.time()), timeout)
+        self._log(f"user:{pk}", timeout)
+
+    def is_revoked(self, token) -> bool:
+        jti = token.get(api_settings.JTI_CLAIM)
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+
+        with self._lock:
+            self._sync()
+            suspects = [
+                member
+                for member in (f"jti:{jti}", f"user:{user_id}")
+                if member in self._bloom
+            ]
+        if not suspects:
+            return False
+
+        jti_key, user_key = JTI_KEY.format(jti=jti), USER_KEY.format(pk=user_id)
+        revoked = cache.get_many([jti_key, user_key])
+        if revoked.get(jti_key):
+            return True
+        # `iat` has a resolution of seconds, tokens issued in the second of the
+        # revocation stay valid
+        revoked_at = revoked.get(user_key)
+        return revoked_at is not None and token.get("iat", 0) < revoked_at
+
+    def _log(self, member: str, timeout: int) -> None:
+        bucket = int(time.time()) // LOG_BUCKET_SECONDS
+        count_key = LOG_COUNT_KEY.format(bucket=bucket)
+        # the counter outlives every entry of its bucket, not only the first one,
+        # or the entries of longer-lived tokens could no longer be loaded
+        log_timeout = _max_token_lifetime() + LOG_BUCKET_SECONDS
+
+        try:
+            number = cache.incr(count_key)
+        except ValueError:
+            # the bucket is new or its counter was evicted
+            if cache.add(count_key, 1, log_timeout):
+                number = 1
+            else:
+                number = cache.incr(count_key)
+        cache.set(LOG_ENTRY_KEY.format(bucket=bucket, number=number), member, timeout)
+
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(member)
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if self._bloom is not None and (
+            now - self._synced_at < settings.USERS_REVOCATION_SYNC_INTERVAL
+        ):
+            return
+        self._synced_at = now
+
+        if self._bloom is None or (
+            self._bloom.count >= settings.USERS_REVOCATION_BLOOM_CAPACITY
+        ):
+            self._bloom = BloomFilter(
+                settings.USERS_REVOCATION_BLOOM_CAPACITY,
+                settings.USERS_REVOCATION_BLOOM_ERROR_RATE,
+            )
+            self._loaded = {}
+
+        # buckets older than the longest token lifetime only hold expired entries
+        current = int(time.time()) // LOG_BUCKET_SECONDS
+        oldest = current - _max_token_lifetime() // LOG_BUCKET_SECONDS - 1
+        # the previous bucket is read again in case of clock skew between hosts
+        first = max(max(self._loaded, default=oldest) - 1, oldest)
+        buckets = range(first, current + 1)
+
+        counts = cache.get_many([LOG_COUNT_KEY.format(bucket=b) for b in buckets])
+        entry_keys = []
+        for bucket in buckets:
+            count = counts.get(LOG_COUNT_KEY.format(bucket=bucket), 0)
+            loaded = self._loaded.get(bucket, 0)
+            # a counter below the loaded entries was evicted and started over
+            if count < loaded:
+                loaded = 0
+            entry_keys += [
+                LOG_ENTRY_KEY.format(bucket=bucket, number=number)
+                for number in range(loaded + 1, count + 1)
+            ]
+            self._loaded[bucket] = count
+        for member in cache.get_many(entry_keys).values():
+            self._bloom.add(member)
+
+        self._loaded = {
+            bucket: count
+            for bucket, count in self._loaded.items()
+            if bucket >= oldest and (count or bucket >= current - 1)
+        }
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,7 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class JWTClaimsScheme(SimpleJWTScheme):
+    """Documents `JWTClaimsAuthentication` like the stock simplejwt scheme."""
+
+    target_class = "users.authentication.JWTClaimsAuthentication"
@@ -1,9 +1,58 @@
+from pathlib import PurePosixPath
+from typing import override
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .authentication import set_user_claims, user_cache
+from .avatars import (
+    available_formats,
+    delete_avatar,
+    is_processed,
+    process_avatar,
+)
+from .revocation import revocation_list
 
 User = get_user_model()
 
 
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Issues tokens carrying the user claims read by `JWTClaimsAuthentication`."""
+
+    @classmethod
+    @override
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Re-reads the user claims of the new access token instead of copying them."""
+
+    @override
+    def validate(self, attrs):
+        if revocation_list.is_revoked(self.token_class(attrs["refresh"])):
+            raise InvalidToken(_("Token is revoked"))
+        data = super().validate(attrs)
+
+        access = AccessToken(data["access"])
+        user = user_cache.get(int(access[api_settings.USER_ID_CLAIM]))
+        if user is not None:
+            set_user_claims(access, user)
+            data["access"] = str(access)
+        return data
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -15,11 +64,72 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 class MeSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField(
+        help_text="URLs of the avatar by size in pixels and format."
+    )
+
     class Meta:
         model = User
-        fields = ("id", "email", "first_name", "last_name", "role", "phone", "image")
+        fields = (
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "role",
+            "phone",
+            "image",
+            "image_variants",
+        )
         read_only_fields = ("email", "role")
 
+    @extend_schema_field(
+        {
+            "type": "object",
+            "nullable": True,
+            "additionalProperties": {
+                "type": "object",
+                "additionalProperties": {"type": "string", "format": "uri"},
+            },
+            "example": {"64": {"webp": "https://example.com/avatar/64.webp"}},
+        }
+    )
+    def get_image_variants(self, obj) -> dict | None:
+        # avatars stored before they were processed have none until
+        # `manage.py process_avatars` runs
+        if not obj.image or not is_processed(obj.image.name):
+            return None
+
+        request = self.context.get("request")
+        name = PurePosixPath(obj.image.name).stem
+        variants = {}
+        for size in settings.USERS_AVATAR_SIZES:
+            variants[str(size)] = {}
+            for image_format in available_formats():
+                url = reverse(
+                    "users:user-avatar",
+                    kwargs={"name": name, "size": size, "image_format": image_format},
+                )
+                variants[str(size)][image_format] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return variants
+
+    def validate_image(self, value):
+        if value is None:
+            return value
+        return process_avatar(value)
+
+    @override
+    def update(self, instance, validated_data):
+        old_image = instance.image.name if "image" in validated_data else None
+        # `instance` may be a cached copy of the user, only sent fields are written
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        if old_image:
+            transaction.on_commit(lambda: delete_avatar(old_image))
+        return instance
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
@@ -34,3 +144,20 @@ class ResetPasswordConfirmSerializer(serializers.Serializer):
     uid_b64 = serializers.CharField(required=True)
     token = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True)
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField(
+        required=False, help_text="Refresh token to revoke along with the access token."
+    )
+
+    def validate_refresh(self, value):
+        try:
+            refresh = RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(e.args[0])
+
+        user_id = self.context["request"].user.pk
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(user_id):
+            raise serializers.ValidationError("Token belongs to another user.")
+        return refresh
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import USER_CLAIMS, user_cache
+from .avatars import delete_avatar
+from .revocation import revocation_list
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_user(sender, instance, **kwargs) -> None:
+    pk = instance.pk
+    user_cache.discard(pk)
+    # again after commit, a concurrent request may have cached the old row
+    transaction.on_commit(lambda: user_cache.discard(pk))
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_lost_access(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Revokes the tokens of a user who is deactivated or no longer an admin.
+
+    Read requests trust the claims of the access token (see `ClaimsUser`), which
+    would otherwise keep the old access until the token expires.
+    """
+
+    update_fields = kwargs.get("update_fields")
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(USER_CLAIMS):
+        return
+
+    old = User.objects.filter(pk=instance.pk).values(*USER_CLAIMS).first()
+    if old is None:
+        return
+    deactivated = old["is_active"] and not instance.is_active
+    admin = User.UserRole.ADMIN
+    demoted = old["role"] == admin and instance.role != admin
+    if deactivated or demoted:
+        pk = instance.pk
+        transaction.on_commit(lambda: revocation_list.revoke_user(pk))
+
+
+@receiver(post_delete, sender=User)
+def delete_user_avatar(sender, instance, **kwargs) -> None:
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: delete_avatar(name))
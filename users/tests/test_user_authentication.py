@@ -0,0 +1,370 @@
+import time
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import ClaimsUser
+from users.checks import check_revocation_cache
+from users.revocation import (
+    LOG_BUCKET_SECONDS,
+    LOG_COUNT_KEY,
+    BloomFilter,
+    RevocationList,
+    revocation_list,
+)
+from users.serializers import TokenObtainPairSerializer
+
+# fixtures
+
+
+@pytest.fixture
+def authenticate(api_client):
+    """Sends the access token of the user, as issued by `token-obtain-pair`."""
+
+    def _authenticate(user, token=None):
+        if token is None:
+            token = TokenObtainPairSerializer.get_token(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    return _authenticate
+
+
+@pytest.fixture
+def issued_earlier():
+    """Tokens of the user, issued a second before the current one."""
+
+    def _issued_earlier(user):
+        refresh = TokenObtainPairSerializer.get_token(user)
+        refresh["iat"] -= 1
+        access = refresh.access_token
+        access["iat"] -= 1
+        return refresh, access
+
+    return _issued_earlier
+
+
+# claims
+
+
+@pytest.mark.django_db
+def test_obtain_token_pair_has_user_claims(api_client, admin):
+    response = api_client.post(
+        reverse("users:token-obtain-pair"),
+        {"email": admin.email, "password": "pass"},
+    )
+
+    access = AccessToken(response.data["access"])
+    assert access["role"] == admin.role
+    assert access["is_active"] is True
+
+
+@pytest.mark.django_db
+def test_token_refresh_reads_fresh_claims(api_client, user):
+    refresh = TokenObtainPairSerializer.get_token(user)
+    user.role = user.UserRole.ADMIN
+    user.save()
+
+    response = api_client.post(
+        reverse("users:token-refresh"), {"refresh": str(refresh)}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert AccessToken(response.data["access"])["role"] == user.UserRole.ADMIN
+
+
+# read requests
+
+
+@pytest.mark.django_db
+def test_read_request_does_not_query_user(
+    api_client, ad, authenticate, django_assert_num_queries
+):
+    authenticate(ad.author)
+
+    # updated_at for validators + row, no user
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse("ads:ad-detail", args=[ad.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert isinstance(response.wsgi_request.user, ClaimsUser)
+    assert response.wsgi_request.user.pk == ad.author.pk
+
+
+@pytest.mark.django_db
+def test_read_request_admin_from_claims(api_client, admin, authenticate):
+    authenticate(admin)
+    response = api_client.get(reverse("ads:ad-cache-stats"))
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_read_request_inactive_claim_fail(api_client, user, authenticate):
+    token = TokenObtainPairSerializer.get_token(user).access_token
+    token["is_active"] = False
+    authenticate(user, token)
+
+    response = api_client.get(reverse("ads:ad-list"))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "field, value",
+    [("role", "User"), ("is_active", False)],
+    ids=["demoted", "inactive"],
+)
+def test_read_request_after_lost_access_fail(
+    api_client,
+    admin,
+    authenticate,
+    issued_earlier,
+    field,
+    value,
+    django_capture_on_commit_callbacks,
+):
+    _, access = issued_earlier(admin)
+    authenticate(admin, access)
+    assert api_client.get(reverse("ads:ad-export")).status_code == status.HTTP_200_OK
+
+    setattr(admin, field, value)
+    with django_capture_on_commit_callbacks(execute=True):
+        admin.save()
+
+    for url in (reverse("ads:ad-export"), reverse("ads:ad-cache-stats")):
+        assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_read_request_token_without_claims(api_client, ad, authenticate):
+    authenticate(ad.author, AccessToken.for_user(ad.author))
+    response = api_client.get(reverse("ads:ad-detail", args=[ad.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not isinstance(response.wsgi_request.user, ClaimsUser)
+
+
+@pytest.mark.django_db
+def test_me_retrieve_reads_profile(api_client, user, authenticate):
+    authenticate(user)
+    response = api_client.get(reverse("users:user-me"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["email"] == user.email
+
+
+# write requests
+
+
+@pytest.mark.django_db
+def test_write_requests_share_cached_user(
+    api_client, ad, authenticate, django_assert_num_queries
+):
+    url = reverse("ads:ad-detail", args=[ad.id])
+    authenticate(ad.author)
+
+    # user + row + update
+    with django_assert_num_queries(3):
+        api_client.patch(url, {"title": "UPDATED"})
+    # row + update
+    with django_assert_num_queries(2):
+        response = api_client.patch(url, {"title": "UPDATED AGAIN"})
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_write_request_sees_saved_user(api_client, ad, random_user, authenticate):
+    url = reverse("ads:ad-detail", args=[ad.id])
+    authenticate(random_user)
+    assert api_client.patch(url, {"title": "UPDATED"}).status_code == (
+        status.HTTP_403_FORBIDDEN
+    )
+
+    random_user.role = random_user.UserRole.ADMIN
+    random_user.save()
+    response = api_client.patch(url, {"title": "UPDATED"})
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_write_request_deleted_user_fail(api_client, user, ad_data, authenticate):
+    authenticate(user)
+    api_client.post(reverse("ads:ad-list"), ad_data)
+    user.delete()
+
+    response = api_client.post(reverse("ads:ad-list"), ad_data)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# revocation
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    members = [f"jti:{i}" for i in range(1000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.django_db
+def test_token_revoke(api_client, user, authenticate, issued_earlier):
+    refresh, access = issued_earlier(user)
+    authenticate(user, access)
+
+    response = api_client.post(reverse("users:token-revoke"), {"refresh": str(refresh)})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert api_client.get(reverse("ads:ad-list")).status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+    api_client.credentials()
+    response = api_client.post(
+        reverse("users:token-refresh"), {"refresh": str(refresh)}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_token_revoke_refresh_of_another_user(
+    api_client, user, random_user, authenticate
+):
+    authenticate(user)
+    other_refresh = TokenObtainPairSerializer.get_token(random_user)
+
+    response = api_client.post(
+        reverse("users:token-revoke"), {"refresh": str(other_refresh)}
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not revocation_list.is_revoked(other_refresh)
+
+
+@pytest.mark.django_db
+def test_change_password_revokes_tokens(api_client, user, authenticate, issued_earlier):
+    refresh, access = issued_earlier(user)
+    authenticate(user, access)
+
+    response = api_client.put(
+        reverse("users:user-change-password"),
+        {"old_password": "pass", "new_password": "NEWPASSWORD"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert revocation_list.is_revoked(access)
+    assert revocation_list.is_revoked(refresh)
+    assert api_client.get(reverse("ads:ad-list")).status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+    # tokens issued from now on are valid
+    authenticate(user)
+    assert api_client.get(reverse("ads:ad-list")).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_reset_password_confirm_revokes_tokens(api_client, user, issued_earlier):
+    refresh, access = issued_earlier(user)
+
+    response = api_client.post(
+        reverse("users:user-reset-password-confirm"),
+        {
+            "uid_b64": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": default_token_generator.make_token(user),
+            "new_password": "NEWPASSWORD",
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert revocation_list.is_revoked(access)
+    assert revocation_list.is_revoked(refresh)
+
+
+@pytest.mark.django_db
+def test_revocation_reaches_other_processes(user, settings, issued_earlier):
+    settings.USERS_REVOCATION_SYNC_INTERVAL = 0
+    other_process = RevocationList()
+    refresh, access = issued_earlier(user)
+    assert not other_process.is_revoked(access)
+
+    revocation_list.revoke_token(access)
+
+    assert other_process.is_revoked(access)
+    assert not other_process.is_revoked(refresh)
+
+
+@pytest.mark.django_db
+def test_revocation_log_survives_evicted_counter(user, settings, issued_earlier):
+    settings.USERS_REVOCATION_SYNC_INTERVAL = 0
+    refresh, access = issued_earlier(user)
+    revocation_list.revoke_token(access)
+
+    cache.delete(LOG_COUNT_KEY.format(bucket=int(time.time()) // LOG_BUCKET_SECONDS))
+    revocation_list.revoke_token(refresh)
+
+    assert RevocationList().is_revoked(refresh)
+
+
+@pytest.mark.django_db
+def test_revocation_log_outlives_first_entry(
+    user, settings, issued_earlier, monkeypatch
+):
+    settings.USERS_REVOCATION_SYNC_INTERVAL = 0
+    refresh, access = issued_earlier(user)
+    # both revocations fall in the same bucket, the access token first
+    now = int(time.time()) // LOG_BUCKET_SECONDS * LOG_BUCKET_SECONDS
+    monkeypatch.setattr(time, "time", lambda: now)
+    revocation_list.revoke_token(access)
+    revocation_list.revoke_token(refresh)
+
+    # the access token and its log entry have expired, the refresh token not
+    now += 20 * 60
+    assert not RevocationList().is_revoked(access)
+    assert RevocationList().is_revoked(refresh)
+
+
+@pytest.mark.parametrize(
+    "debug, check_id", [(False, "users.E001"), (True, "users.W001")]
+)
+def test_revocation_cache_check_rejects_local_cache(settings, debug, check_id):
+    settings.DEBUG = debug
+
+    assert [message.id for message in check_revocation_cache(None)] == [check_id]
+
+
+def test_revocation_cache_check_accepts_shared_cache(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://localhost:6379",
+        }
+    }
+
+    assert check_revocation_cache(None) == []
+
+
+@pytest.mark.django_db
+def test_not_revoked_check_skips_cache(user, issued_earlier, monkeypatch):
+    _, access = issued_earlier(user)
+    # the first check loads the filter
+    revocation_list.is_revoked(access)
+
+    calls = []
+    monkeypatch.setattr(
+        "users.revocation.cache.get_many", lambda keys: calls.append(keys) or {}
+    )
+
+    assert not revocation_list.is_revoked(access)
+    assert not calls
@@ -0,0 +1,217 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from users.avatars import (
+    HEADER_MAX_SIZE,
+    AvatarUploadHandler,
+    available_formats,
+    is_processed,
+    variant_name,
+)
+
+# fixtures
+
+
+@pytest.fixture
+def image_file():
+    """A JPEG upload with EXIF data, rotated by its orientation tag."""
+
+    def _image_file(width=2000, height=1000, name="photo.jpg"):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotated 90 degrees clockwise
+        exif[0x010F] = "Camera maker"
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), "red").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    return _image_file
+
+
+@pytest.fixture
+def legacy_avatar(user, image_file, media_root):
+    """An avatar stored as uploaded, before avatars were processed."""
+
+    image = image_file(name="my.holiday_photo.jpg")
+    user.image.save(image.name, ContentFile(image.read()))
+    return user.image.name
+
+
+def upload_avatar(api_client, user, image):
+    api_client.force_authenticate(user)
+    return api_client.patch(
+        reverse("users:user-me"), {"image": image}, format="multipart"
+    )
+
+
+# upload
+
+
+@pytest.mark.django_db
+def test_avatar_upload_is_downsized_without_metadata(
+    api_client, user, image_file, media_root, settings
+):
+    settings.USERS_AVATAR_MAX_SIZE = 512
+
+    response = upload_avatar(api_client, user, image_file())
+
+    assert response.status_code == status.HTTP_200_OK
+    user.refresh_from_db()
+    assert user.image.name.startswith("avatars/")
+    assert user.image.name.endswith(".webp")
+    with default_storage.open(user.image.name) as file, Image.open(file) as image:
+        assert image.format == "WEBP"
+        # rotated upright, then downsized
+        assert image.size == (256, 512)
+        assert not image.getexif()
+
+    variants = response.data["image_variants"]
+    assert set(variants) == {str(size) for size in settings.USERS_AVATAR_SIZES}
+    assert set(variants["64"]) == set(available_formats())
+
+
+@pytest.mark.django_db
+def test_avatar_upload_too_many_pixels(
+    api_client, user, image_file, media_root, settings
+):
+    settings.USERS_AVATAR_MAX_PIXELS = 1000
+
+    response = upload_avatar(api_client, user, image_file())
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "image" in response.data
+
+
+@pytest.mark.django_db
+def test_avatar_upload_too_large(api_client, user, image_file, media_root, settings):
+    settings.USERS_AVATAR_MAX_UPLOAD_SIZE = 1000
+
+    response = upload_avatar(api_client, user, image_file())
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "larger than" in str(response.data["image"][0])
+    user.refresh_from_db()
+    assert not user.image
+
+
+@pytest.mark.django_db
+def test_avatar_upload_not_an_image(api_client, user, media_root):
+    image = SimpleUploadedFile("photo.jpg", b"not an image", content_type="image/jpeg")
+
+    response = upload_avatar(api_client, user, image)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "image" in response.data
+
+
+def test_avatar_upload_handler_stops_after_header():
+    handler = AvatarUploadHandler()
+    handler.new_file("image", "photo.jpg", "image/jpeg", None)
+    chunk = b"\0" * handler.chunk_size
+
+    received = 0
+    with pytest.raises(ValidationError):
+        while True:
+            handler.receive_data_chunk(chunk, received)
+            received += len(chunk)
+
+    # the rest of a large upload is never read
+    assert received < HEADER_MAX_SIZE
+    assert handler.file.closed
+
+
+@pytest.mark.django_db
+def test_avatar_replace_deletes_old_files(
+    api_client, user, image_file, media_root, django_capture_on_commit_callbacks
+):
+    upload_avatar(api_client, user, image_file())
+    user.refresh_from_db()
+    old_image = user.image.name
+    api_client.get(
+        api_client.get(reverse("users:user-me")).data["image_variants"]["64"]["webp"]
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        upload_avatar(api_client, user, image_file())
+
+    assert not default_storage.exists(old_image)
+    assert not default_storage.exists(variant_name(old_image, 64, "webp"))
+
+
+# variants
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("image_format", available_formats())
+def test_avatar_variant_made_on_first_access(
+    api_client, user, image_file, media_root, image_format
+):
+    upload_avatar(api_client, user, image_file())
+    user.refresh_from_db()
+    url = reverse("users:user-me")
+    variant_url = api_client.get(url).data["image_variants"]["128"][image_format]
+    api_client.force_authenticate(None)
+
+    response = api_client.get(variant_url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == f"image/{image_format}"
+    assert "immutable" in response["Cache-Control"]
+    image = Image.open(io.BytesIO(b"".join(response.streaming_content)))
+    assert max(image.size) == 128
+    assert default_storage.exists(variant_name(user.image.name, 128, image_format))
+
+
+@pytest.mark.django_db
+def test_avatar_variant_unknown_size(api_client, user, image_file, media_root):
+    upload_avatar(api_client, user, image_file())
+    user.refresh_from_db()
+    name = user.image.name.removeprefix("avatars/").removesuffix(".webp")
+
+    response = api_client.get(
+        reverse(
+            "users:user-avatar",
+            kwargs={"name": name, "size": 100, "image_format": "webp"},
+        )
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# legacy avatars
+
+
+@pytest.mark.django_db
+def test_legacy_avatar_has_no_variants(api_client, user, legacy_avatar):
+    api_client.force_authenticate(user)
+
+    response = api_client.get(reverse("users:user-me"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["image"].endswith(legacy_avatar)
+    assert response.data["image_variants"] is None
+
+
+@pytest.mark.django_db
+def test_process_avatars_command(api_client, user, legacy_avatar):
+    call_command("process_avatars", verbosity=0)
+
+    user.refresh_from_db()
+    assert is_processed(user.image.name)
+    assert not default_storage.exists(legacy_avatar)
+    with default_storage.open(user.image.name) as file, Image.open(file) as image:
+        assert image.format == "WEBP"
+        assert not image.getexif()
+
+    api_client.force_authenticate(user)
+    variants = api_client.get(reverse("users:user-me")).data["image_variants"]
+    api_client.force_authenticate(None)
+    assert api_client.get(variants["64"]["webp"]).status_code == status.HTTP_200_OK
@@ -0,0 +1,153 @@
+import threading
+from contextlib import contextmanager
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from users.checks import check_hashing_pool
+from users.hashers import hashing_pool
+
+# fixtures
+
+
+@pytest.fixture
+def scrypt(settings):
+    """The production hashers, with a cheap scrypt profile."""
+
+    settings.PASSWORD_HASHERS = [
+        "users.hashers.ScryptPasswordHasher",
+        "users.hashers.PBKDF2PasswordHasher",
+    ]
+    settings.USERS_SCRYPT_WORK_FACTOR = 2**10
+    settings.USERS_SCRYPT_PARALLELISM = 1
+    # nested `verify` -> `encode` calls must not wait for a second thread
+    settings.USERS_HASHING_WORKERS = 1
+    settings.USERS_HASHING_QUEUE_SIZE = 0
+    return settings
+
+
+@pytest.fixture
+def busy_hashing_pool():
+    """Takes the only slot of the `scrypt` pool within a `with` block."""
+
+    @contextmanager
+    def _busy_hashing_pool():
+        started, release = threading.Event(), threading.Event()
+
+        def hash_slowly():
+            started.set()
+            release.wait(5)
+
+        busy = threading.Thread(target=hashing_pool.run, args=(hash_slowly,))
+        busy.start()
+        started.wait(5)
+        try:
+            yield
+        finally:
+            release.set()
+            busy.join()
+
+    return _busy_hashing_pool
+
+
+def login(api_client, user):
+    return api_client.post(
+        reverse("users:token-obtain-pair"), {"email": user.email, "password": "pass"}
+    )
+
+
+# hashers
+
+
+@pytest.mark.django_db
+def test_login_upgrades_legacy_hash(api_client, user, scrypt):
+    user.password = PBKDF2PasswordHasher().encode("pass", "salt", iterations=1000)
+    user.save()
+
+    response = login(api_client, user)
+
+    assert response.status_code == status.HTTP_200_OK
+    user.refresh_from_db()
+    assert user.password.startswith("scrypt$1024$")
+    assert user.check_password("pass")
+
+
+@pytest.mark.django_db
+def test_login_rehashes_with_new_cost(api_client, user, scrypt):
+    user.password = make_password("pass")
+    user.save()
+    scrypt.USERS_SCRYPT_WORK_FACTOR = 2**11
+
+    response = login(api_client, user)
+
+    assert response.status_code == status.HTTP_200_OK
+    user.refresh_from_db()
+    assert user.password.startswith("scrypt$2048$")
+
+
+@pytest.mark.django_db
+def test_login_over_hashing_capacity_is_rejected(
+    api_client, user, scrypt, busy_hashing_pool
+):
+    user.password = make_password("pass")
+    user.save()
+
+    with busy_hashing_pool():
+        response = login(api_client, user)
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response["Retry-After"] == "1"
+    assert login(api_client, user).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_admin_login_over_hashing_capacity_is_rejected(
+    client, admin, scrypt, busy_hashing_pool
+):
+    admin.password = make_password("pass")
+    admin.save()
+
+    with busy_hashing_pool():
+        response = client.post(
+            reverse("admin:login"), {"username": admin.email, "password": "pass"}
+        )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response["Retry-After"] == "1"
+
+
+def test_hashing_pool_check_leaves_a_request_thread_free(settings):
+    settings.GUNICORN_THREADS = 4
+    settings.USERS_HASHING_WORKERS = 2
+    settings.USERS_HASHING_QUEUE_SIZE = 1
+    assert check_hashing_pool(None) == []
+
+    settings.USERS_HASHING_QUEUE_SIZE = 2
+    assert [message.id for message in check_hashing_pool(None)] == ["users.E002"]
+
+
+def test_calibrate_password_hasher_prints_settings():
+    out = StringIO()
+
+    call_command(
+        "calibrate_password_hasher",
+        "--hasher=scrypt",
+        "--target-ms=1",
+        "--max-memory=1",
+        "--rounds=1",
+        stdout=out,
+    )
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].endswith("ms per hash on this host")
+    params = dict(line.split("=") for line in lines[1:])
+    assert set(params) == {
+        "USERS_SCRYPT_WORK_FACTOR",
+        "USERS_SCRYPT_BLOCK_SIZE",
+        "USERS_SCRYPT_PARALLELISM",
+    }
+    assert int(params["USERS_SCRYPT_WORK_FACTOR"]) <= 2**10
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from users.mail import MailWorker, OutboxBackend
+from users.models import OutboxEmail, User
+
+# fixtures
+
+
+@pytest.fixture
+def outbox(settings):
+    settings.EMAIL_BACKEND = "users.mail.OutboxBackend"
+    settings.USERS_MAIL_DELIVERY_BACKEND = (
+        "django.core.mail.backends.locmem.EmailBackend"
+    )
+
+
+def queue(count=1):
+    OutboxBackend().send_messages(
+        [
+            mail.EmailMultiAlternatives(
+                f"Subject {number}",
+                "Body",
+                "from@example.com",
+                [f"user{number}@example.com"],
+                headers={"X-Test": "1"},
+                alternatives=[("<p>Body</p>", "text/html")],
+            )
+            for number in range(count)
+        ]
+    )
+
+
+# outbox
+
+
+@pytest.mark.django_db
+def test_reset_password_request_only_queues_email(api_client, user, outbox):
+    response = api_client.post(
+        reverse("users:user-reset-password"), {"email": user.email}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mail.outbox == []
+    email = OutboxEmail.objects.get()
+    assert email.message["to"] == [user.email]
+    assert "reset" in email.message["body"]
+
+
+@pytest.mark.django_db
+def test_worker_delivers_and_deletes_emails(outbox, monkeypatch):
+    queue(3)
+    worker = MailWorker(batch_size=10)
+    closed = []
+    monkeypatch.setattr(worker.connection, "close", lambda: closed.append(True))
+
+    assert worker.deliver_batch() == (3, 0)
+    # kept open between messages and batches, closed once the outbox is drained
+    assert closed == []
+    assert worker.deliver_batch() == (0, 0)
+    assert closed == [True]
+
+    assert not OutboxEmail.objects.exists()
+    assert [message.to for message in mail.outbox] == [
+        [f"user{number}@example.com"] for number in range(3)
+    ]
+    assert mail.outbox[0].extra_headers == {"X-Test": "1"}
+    assert mail.outbox[0].alternatives[0].mimetype == "text/html"
+
+
+@pytest.mark.django_db
+def test_worker_retries_with_backoff(outbox, settings, monkeypatch):
+    settings.USERS_MAIL_MAX_ATTEMPTS = 2
+    settings.USERS_MAIL_RETRY_DELAY = 30
+    queue()
+    worker = MailWorker()
+
+    def disconnect(messages):
+        raise SMTPServerDisconnected("Connection unexpectedly closed")
+
+    monkeypatch.setattr(worker.connection, "send_messages", disconnect)
+
+    assert worker.deliver_batch() == (0, 1)
+    email = OutboxEmail.objects.get()
+    assert email.status == OutboxEmail.Status.PENDING
+    assert email.attempts == 1
+    assert email.last_error.startswith("SMTPServerDisconnected")
+    assert email.next_attempt_at > timezone.now()
+
+    # not due yet
+    assert worker.deliver_batch() == (0, 0)
+
+    OutboxEmail.objects.update(next_attempt_at=timezone.now())
+    assert worker.deliver_batch() == (0, 1)
+    email.refresh_from_db()
+    assert email.status == OutboxEmail.Status.FAILED
+    assert email.attempts == 2
+    # nothing left to deliver, only what the message was
+    assert email.message["subject"] == "Subject 0"
+    assert email.message["body"] == ""
+    assert email.message["alternatives"] == []
+
+
+@pytest.mark.django_db
+def test_worker_purges_failed_emails_past_retention(outbox, settings):
+    settings.USERS_MAIL_FAILED_RETENTION = 7
+    queue(2)
+    old, recent = OutboxEmail.objects.order_by("pk")
+    OutboxEmail.objects.update(status=OutboxEmail.Status.FAILED)
+    OutboxEmail.objects.filter(pk=old.pk).update(
+        created_at=timezone.now() - timedelta(days=8)
+    )
+
+    assert MailWorker().deliver_batch() == (0, 0)
+
+    assert list(OutboxEmail.objects.all()) == [recent]
+
+
+@pytest.mark.django_db
+def test_admin_does_not_show_message_body(client, outbox, settings):
+    # static files are hashed when the image is built, not for the tests
+    settings.STORAGES = settings.STORAGES | {
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        }
+    }
+    queue()
+    email = OutboxEmail.objects.get()
+    client.force_login(User.objects.create_superuser("staff@example.com", "pass"))
+
+    response = client.get(reverse("admin:users_outboxemail_change", args=[email.pk]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "Subject 0" in response.content.decode()
+    assert "Body" not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_run_mail_worker_drains_outbox(outbox):
+    queue(5)
+
+    call_command("run_mail_worker", "--once", "--batch-size=2", verbosity=0)
+
+    assert len(mail.outbox) == 5
+    assert not OutboxEmail.objects.exists()
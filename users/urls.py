@@ -3,11 +3,13 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .apps import UsersConfig
 from .views import (
+    AvatarVariantView,
     ChangePasswordView,
     MeAPIView,
     RegisterAPIView,
     ResetPasswordConfirmView,
     ResetPasswordRequestView,
+    TokenRevokeView,
 )
 
 app_name = UsersConfig.name
@@ -16,9 +18,15 @@ urlpatterns = [
     # token
     path("token/", TokenObtainPairView.as_view(), name="token-obtain-pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
+    path("token/revoke/", TokenRevokeView.as_view(), name="token-revoke"),
     # user
     path("register/", RegisterAPIView.as_view(), name="user-register"),
     path("me/", MeAPIView.as_view(), name="user-me"),
+    path(
+        "avatars/<slug:name>/<int:size>.<slug:image_format>",
+        AvatarVariantView.as_view(),
+        name="user-avatar",
+    ),
     path("change-password/", ChangePasswordView.as_view(), name="user-change-password"),
     path(
         "reset-password/",
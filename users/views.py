@@ -3,13 +3,24 @@ from typing import override
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
+from django.core.files.storage import default_storage
+from django.http import Http404
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiResponse, extend_schema
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from config.media import media_response
+from users.avatars import (
+    FORMATS,
+    AvatarUploadHandler,
+    available_formats,
+    get_variant,
+)
+from users.revocation import revocation_list
 from users.utils import send_reset_password_email
 
 from .serializers import (
@@ -18,6 +29,7 @@ from .serializers import (
     RegisterSerializer,
     ResetPasswordConfirmSerializer,
     ResetPasswordRequestSerializer,
+    TokenRevokeSerializer,
 )
 
 User = get_user_model()
@@ -41,16 +53,80 @@ class MeAPIView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MeSerializer
     permission_classes = (IsAuthenticated,)
 
+    @override
+    def initialize_request(self, request, *args, **kwargs):
+        # avatars are checked while they are uploaded, see `users.avatars`
+        request.upload_handlers = [AvatarUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     @override
     def get_object(self):
-        return self.request.user
+        # read requests only have a `ClaimsUser`, see `users.authentication`
+        if isinstance(self.request.user, User):
+            return self.request.user
+        return generics.get_object_or_404(User, pk=self.request.user.pk)
 
 
 @extend_schema(
-    summary="Change user password",
-    description="This endpoint allows authenticated users to change their password.",
+    summary="Retrieve an avatar variant",
+    description="This endpoint returns a user avatar at one of the configured sizes "
+    "and formats, listed by `image_variants` of the user. A variant is made on "
+    "first access and kept.",
+    responses={
+        (200, "image/webp"): OpenApiTypes.BINARY,
+        (200, "image/avif"): OpenApiTypes.BINARY,
+        404: OpenApiResponse(),
+    },
+)
+class AvatarVariantView(generics.GenericAPIView):
+    permission_classes = (AllowAny,)
+    # avatars are loaded by `<img>` tags, which send no token
+    authentication_classes = ()
+
+    def get(self, request, name, size, image_format):
+        avatar = f"{User._meta.get_field('image').upload_to}{name}.webp"
+        if (
+            size not in settings.USERS_AVATAR_SIZES
+            or image_format not in available_formats()
+            or not default_storage.exists(avatar)
+        ):
+            raise Http404
+
+        variant = get_variant(avatar, size, image_format)
+        return media_response(variant, content_type=FORMATS[image_format][1])
+
+
+@extend_schema(
+    summary="Revoke tokens",
+    description="This endpoint allows authenticated users to revoke the access "
+    "token of the request and, optionally, a refresh token, e.g. on logout.",
     responses={200: OpenApiResponse(), 400: OpenApiResponse()},
 )
+class TokenRevokeView(generics.GenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = TokenRevokeSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revocation_list.revoke_token(request.auth)
+        if refresh := serializer.validated_data.get("refresh"):
+            revocation_list.revoke_token(refresh)
+
+        return Response({"message": "Token revoked"}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Change user password",
+    description="This endpoint allows authenticated users to change their password. "
+    "Every token issued to the user before is revoked.",
+    responses={
+        200: OpenApiResponse(),
+        400: OpenApiResponse(),
+        503: OpenApiResponse(description="Too many password checks at once"),
+    },
+)
 class ChangePasswordView(generics.GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = ChangePasswordSerializer
@@ -67,7 +143,9 @@ class ChangePasswordView(generics.GenericAPIView):
             )
 
         user.set_password(serializer.validated_data["new_password"])
-        user.save()
+        # `request.user` may be a cached copy, only the password is written
+        user.save(update_fields=["password"])
+        revocation_list.revoke_user(user.pk)
 
         return Response(
             {"message": "Password successfully changed"}, status=status.HTTP_200_OK
@@ -108,8 +186,13 @@ class ResetPasswordRequestView(generics.GenericAPIView):
 
 @extend_schema(
     summary="Confirm user password reset",
-    description="This endpoint allows user to confirm password reset.",
-    responses={200: OpenApiResponse(), 400: OpenApiResponse()},
+    description="This endpoint allows user to confirm password reset. Every token "
+    "issued to the user before is revoked.",
+    responses={
+        200: OpenApiResponse(),
+        400: OpenApiResponse(),
+        503: OpenApiResponse(description="Too many password checks at once"),
+    },
 )
 class ResetPasswordConfirmView(generics.GenericAPIView):
     permission_classes = (AllowAny,)
@@ -137,6 +220,7 @@ class ResetPasswordConfirmView(generics.GenericAPIView):
 
         user.set_password(serializer.validated_data["new_password"])
         user.save()
+        revocation_list.revoke_user(user.pk)
 
         return Response(
             {"message": "Password successfully reset"}, status=status.HTTP_200_OK